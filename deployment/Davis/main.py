@@ -199,14 +199,8 @@ class ReviewAnalysisSystem:
             
             if languages:
                 logger.info(f"開始翻譯店家 {store_name} 的評論摘要")
-                translations = self.translator.batch_translate_and_save(store_id, review_summary)
-                
-                # Step 7: 更新store_translations表
-                for lang_code, translation in translations.items():
-                    if translation:
-                        self.db_manager.update_store_translation(
-                            store_id, lang_code, translation
-                        )
+                # 翻譯結果已由 batch_translate_and_save 一次批次寫入 store_translations
+                self.translator.batch_translate_and_save(store_id, review_summary)
             
             logger.info(f"店家 {store_name} 分析和翻譯完成")
             
@@ -239,6 +233,7 @@ database = lingua_order_talk
 user = root
 password = your_password
 port = 3306
+pool_size = 10
 
 [serpapi]
 api_key = your_serpapi_key
@@ -248,6 +243,14 @@ api_key = your_gemini_key
 
 [google_translate]
 api_key = your_google_translate_key
+
+[translator]
+max_workers = 5
+requests_per_minute = 60
+tokens_per_minute = 1000000
+request_timeout = 60
+max_retries = 3
+lock_timeout = 30
             """)
             return
         
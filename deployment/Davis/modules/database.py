@@ -95,7 +95,8 @@ class DatabaseManager:
             self.connection = mysql.connector.connect(
                 **db_config,
                 charset='utf8mb4',
-                collation='utf8mb4_unicode_ci'
+                collation='utf8mb4_unicode_ci',
+                use_pure=False  # 使用 C 擴充模組
             )
             
             if self.connection.is_connected():
@@ -132,6 +133,8 @@ class DatabaseManager:
             self._check_languages_table()
             # 檢查並創建 store_translations 表
             self._check_store_translations_table()
+            # 檢查並創建 translation_cache 表
+            self._check_translation_cache_table()
             
         except Exception as e:
             logger.error(f"檢查資料庫結構時發生錯誤: {e}")
@@ -188,19 +191,88 @@ class DatabaseManager:
                     CREATE TABLE store_translations (
                         id INT AUTO_INCREMENT PRIMARY KEY,
                         store_id INT NOT NULL,
-                        language_code VARCHAR(5) NOT NULL,
+                        language_code VARCHAR(10) NOT NULL,
                         description TEXT,
                         translated_summary TEXT,
-                        UNIQUE KEY uk_store_language (store_id, language_code)
+                        source_hash CHAR(64) NULL,
+                        UNIQUE KEY uk_store_language (store_id, language_code),
+                        KEY idx_store_source_hash (store_id, source_hash, language_code)
                     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin
                 """
                 self.cursor.execute(create_translations_query)
                 self.connection.commit()
                 logger.info("創建 store_translations 表")
+            else:
+                # 既有的表補上 source_hash 欄位（記錄翻譯所依據的原文 sha256）
+                check_column_query = """
+                    SELECT COUNT(*) as count
+                    FROM information_schema.columns 
+                    WHERE table_schema = %s AND table_name = 'store_translations'
+                    AND column_name = 'source_hash'
+                """
+                self.cursor.execute(check_column_query, (database_name,))
+                result = self.cursor.fetchone()
+                
+                if result['count'] == 0:
+                    self.cursor.execute("""
+                        ALTER TABLE store_translations
+                        ADD COLUMN source_hash CHAR(64) NULL,
+                        ADD KEY idx_store_source_hash (store_id, source_hash, language_code)
+                    """)
+                    self.connection.commit()
+                    logger.info("store_translations 表新增 source_hash 欄位")
+                
+                # 既有的表將 language_code 放寬為 VARCHAR(10)，以容納 zh-Hant 等較長的語言代碼
+                check_length_query = """
+                    SELECT character_maximum_length as length
+                    FROM information_schema.columns 
+                    WHERE table_schema = %s AND table_name = 'store_translations'
+                    AND column_name = 'language_code'
+                """
+                self.cursor.execute(check_length_query, (database_name,))
+                result = self.cursor.fetchone()
+                
+                if result and result['length'] is not None and result['length'] < 10:
+                    self.cursor.execute("""
+                        ALTER TABLE store_translations
+                        MODIFY COLUMN language_code VARCHAR(10) NOT NULL
+                    """)
+                    self.connection.commit()
+                    logger.info("store_translations 表的 language_code 欄位放寬為 VARCHAR(10)")
             
         except Error as e:
             logger.error(f"檢查 store_translations 表時發生錯誤: {e}")
     
+    def _check_translation_cache_table(self):
+        """檢查並創建 translation_cache 表（翻譯結果快取）"""
+        try:
+            database_name = self.config['mysql']['database']
+                
+            check_table_query = """
+                SELECT COUNT(*) as count
+                FROM information_schema.tables 
+                WHERE table_schema = %s AND table_name = 'translation_cache'
+            """
+            self.cursor.execute(check_table_query, (database_name,))
+            result = self.cursor.fetchone()
+            
+            if result['count'] == 0:
+                create_cache_query = """
+                    CREATE TABLE translation_cache (
+                        source_hash CHAR(64) NOT NULL,
+                        language_code VARCHAR(10) NOT NULL,
+                        translated_text TEXT NOT NULL,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (source_hash, language_code)
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin
+                """
+                self.cursor.execute(create_cache_query)
+                self.connection.commit()
+                logger.info("創建 translation_cache 表")
+            
+        except Error as e:
+            logger.error(f"檢查 translation_cache 表時發生錯誤: {e}")
+    
     def disconnect(self):
         """關閉資料庫連接"""
         try:
@@ -480,42 +552,6 @@ class DatabaseManager:
         except Error as e:
             logger.error(f"取得語言資料失敗: {e}")
             return []
-    
-    def update_store_translation(self, store_id, lang_code, translation):
-        """更新店家翻譯"""
-        try:
-            # 先檢查是否已存在
-            check_query = """
-                SELECT id FROM store_translations 
-                WHERE store_id = %s AND language_code = %s
-            """
-            self.cursor.execute(check_query, (store_id, lang_code))
-            existing = self.cursor.fetchone()
-            
-            if existing:
-                # 更新現有記錄
-                update_query = """
-                    UPDATE store_translations 
-                    SET translated_summary = %s
-                    WHERE store_id = %s AND language_code = %s
-                """
-                self.cursor.execute(update_query, (translation, store_id, lang_code))
-            else:
-                # 插入新記錄
-                insert_query = """
-                    INSERT INTO store_translations (
-                        store_id, language_code, translated_summary
-                    ) VALUES (%s, %s, %s)
-                """
-                self.cursor.execute(insert_query, (store_id, lang_code, translation))
-            
-            self.connection.commit()
-            logger.info(f"更新店家 {store_id} 的 {lang_code} 翻譯")
-            
-        except Error as e:
-            logger.error(f"更新翻譯失敗: {e}")
-            if self.connection:
-                self.connection.rollback()
 
 # 測試 DatabaseManager 是否能正確導入
 if __name__ == "__main__":
@@ -1,50 +1,222 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property
+
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from utils.logger import setup_logger
 import mysql.connector.pooling
 from mysql.connector import Error
 
 logger = setup_logger('translator')
 
+# 翻譯提示詞範本（模組載入時建立一次）
+TRANSLATION_PROMPT_TEMPLATE = """
+請將以下繁體中文的餐廳評論摘要翻譯成{target_language}，保持原有格式和結構，不要加任何前言或說明：
+
+{review_summary}
+
+翻譯要求：
+1. 保持原有的標題格式（## 標題）
+2. 保持菜品Top5的編號格式
+3. 翻譯要自然流暢，符合目標語言的表達習慣
+4. 菜品名稱可以保留中文並加上{target_language}翻譯
+5. 數字和統計資訊保持不變
+6. 使用專業的餐廳評論術語
+7. 直接輸出分析報告，不要有「好的，這是...」等開場白
+"""
+
+MULTI_TRANSLATION_PROMPT_TEMPLATE = """
+請將以下繁體中文的餐廳評論摘要分別翻譯成下列各種語言，保持原有格式和結構，不要加任何前言或說明：
+
+{review_summary}
+
+目標語言（語言代碼: 語言名稱）：
+{language_lines}
+
+翻譯要求：
+1. 保持原有的標題格式（## 標題）
+2. 保持菜品Top5的編號格式
+3. 翻譯要自然流暢，符合目標語言的表達習慣
+4. 菜品名稱可以保留中文並加上目標語言翻譯
+5. 數字和統計資訊保持不變
+6. 使用專業的餐廳評論術語
+7. 直接輸出分析報告，不要有「好的，這是...」等開場白
+8. 只輸出嚴格的 JSON 物件，鍵為上列語言代碼，值為該語言的完整翻譯
+"""
+
+# 開場白重試時附加的提示詞
+STRICT_PROMPT_SUFFIX = "\n請從翻譯內容的第一個字開始輸出，不要有任何開場白或說明。\n"
+
+# 串流翻譯時用來偵測開場白的前綴與檢查長度
+TRANSLATION_PREAMBLES = ('好的', '當然', '以下是', 'Sure', 'Here is', "Here's")
+PREAMBLE_CHECK_CHARS = 20
+
+# 單一請求多語言翻譯的輸出 token 上限
+# gemini-2.5-flash 的思考 (thinking) token 也計入 max_output_tokens，且目前的 SDK 無法設定思考預算，
+# 上限需預留思考用量，避免較長的摘要被截斷後被視為翻譯失敗
+MAX_OUTPUT_TOKENS_PER_LANGUAGE = 8192
+MAX_OUTPUT_TOKENS = 65536
+
+# 行程內翻譯快取（LRU），鍵為 (原文 sha256, 語言代碼)
+TRANSLATION_CACHE_SIZE = 1024
+_translation_cache = OrderedDict()
+_translation_cache_lock = threading.Lock()
+
+# 語言對應表快取（跨實例共用），鍵為 (host, port, database)
+LANGUAGE_CACHE_TTL = 3600
+_language_mapping_cache = {}
+_language_mapping_lock = threading.Lock()
+
+# 可重試的 Gemini API 暫時性錯誤（429 / 5xx / 逾時）
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+)
+
+class RateLimiter:
+    """執行緒安全的 token bucket 速率限制器，會依 API 限流回應自適應調整補充速率"""
+    def __init__(self, rate, per=60.0):
+        self.capacity = max(1, int(rate))
+        self.max_fill_rate = self.capacity / float(per)
+        self.fill_rate = self.max_fill_rate
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.fill_rate)
+        self.last_refill = now
+    
+    def acquire(self, amount=1):
+        """取得指定數量的 token，不足時等待補充（amount=0 表示僅等待額度不再透支）"""
+        while True:
+            with self.lock:
+                self._refill()
+                
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                
+                wait_time = (amount - self.tokens) / self.fill_rate
+            time.sleep(wait_time)
+    
+    def consume(self, amount):
+        """事後扣除實際用量（可透支，之後的 acquire 會等待補回）"""
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+    
+    def throttle(self):
+        """收到 429 時將補充速率減半"""
+        with self.lock:
+            self._refill()
+            self.fill_rate = max(self.max_fill_rate / 10, self.fill_rate / 2)
+    
+    def recover(self):
+        """請求成功時逐步恢復到設定的補充速率"""
+        with self.lock:
+            if self.fill_rate < self.max_fill_rate:
+                self._refill()
+                self.fill_rate = min(self.max_fill_rate, self.fill_rate * 1.1)
+
 class ReviewTranslator:
+    # 提示詞使用的語言名稱，優先於資料庫中的 lang_name
+    _LANG_OVERRIDES = {
+        'en': 'English',
+        'ja': 'Japanese',
+        'ko': 'Korean',
+        'zh-Hant': 'Traditional Chinese (Taiwan)',
+        'zh': 'Traditional Chinese (Taiwan)'
+    }
+    
     def __init__(self, config):
+        # Gemini 模型、資料庫連線池與語言對應表皆於第一次使用時才建立
         self.api_key = config['api_keys']['REVIEW_GEMINI_API_KEY']
-        genai.configure(api_key=self.api_key)
-        #self.model = genai.GenerativeModel('gemini-2.5-pro')
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
         
-        # 資料庫配置
-        self.db_config = config['mysql']
-        self.db_pool = None
+        # 並行翻譯設定 - 可由設定檔 [translator] 區塊覆寫
+        translator_config = config['translator'] if config.has_section('translator') else {}
+        self.max_workers = int(translator_config.get('max_workers', 5))
+        self.rate_limiter = RateLimiter(int(translator_config.get('requests_per_minute', 60)))
+        self.token_limiter = RateLimiter(int(translator_config.get('tokens_per_minute', 1000000)))
+        
+        # Gemini 請求逾時與重試設定，避免單一請求卡住整個批次
+        self.request_timeout = float(translator_config.get('request_timeout', 60))
+        self.max_retries = int(translator_config.get('max_retries', 3))
         
-        # 語言對應表 - 將從資料庫動態載入
-        self.language_mapping = {}
+        # 等待其他工作程序釋放店家翻譯鎖的秒數
+        self.lock_timeout = int(translator_config.get('lock_timeout', 30))
         
-        # 初始化資料庫連線池並載入語言設定
-        self._create_db_pool()
-        self._load_languages()
+        # 資料庫配置
+        self.db_config = config['mysql']
+    
+    @cached_property
+    def model(self):
+        """Gemini 模型（延遲初始化）"""
+        genai.configure(api_key=self.api_key)
+        #return genai.GenerativeModel('gemini-2.5-pro')
+        return genai.GenerativeModel('gemini-2.5-flash')
+    
+    @cached_property
+    def db_pool(self):
+        """資料庫連線池（延遲初始化）"""
+        return self._create_db_pool()
+    
+    @cached_property
+    def language_mapping(self):
+        """語言對應表 - 第一次使用時從資料庫動態載入"""
+        return self._load_languages()
+    
+    @cached_property
+    def _supported_languages(self):
+        return tuple(self.language_mapping)
+    
+    @cached_property
+    def _supported_language_set(self):
+        return frozenset(self.language_mapping)
     
     def _create_db_pool(self):
         """建立資料庫連線池"""
         try:
-            self.db_pool = mysql.connector.pooling.MySQLConnectionPool(
+            db_pool = mysql.connector.pooling.MySQLConnectionPool(
                 pool_name="review_translator_pool",
-                pool_size=10,  # 設定連線池大小
+                pool_size=int(self.db_config.get('pool_size', 10)),  # 設定連線池大小
+                # 歸還連線時不送 COM_RESET_CONNECTION；本模組不設定 session 變數，
+                # 且 advisory lock 會在歸還前明確釋放，因此不需要重置 session
+                pool_reset_session=False,
                 host=self.db_config['host'],
                 database=self.db_config['database'],
                 user=self.db_config['user'],
                 password=self.db_config['password'],
                 port=int(self.db_config['port']),
                 charset='utf8mb4',
-                collation='utf8mb4_unicode_ci'
+                collation='utf8mb4_unicode_ci',
+                use_pure=False  # 使用 C 擴充模組，降低每次查詢的協定處理開銷
             )
             logger.info("翻譯器資料庫連線池建立成功")
+            return db_pool
             
         except Error as e:
             logger.error(f"翻譯器資料庫連線池建立失敗: {e}")
             raise
     
     def _load_languages(self):
-        """從資料庫載入語言設定"""
+        """從資料庫載入語言設定（模組層級快取，同一資料庫的所有實例共用）"""
+        cache_key = (self.db_config['host'], self.db_config['port'], self.db_config['database'])
+        with _language_mapping_lock:
+            cached = _language_mapping_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < LANGUAGE_CACHE_TTL:
+                logger.info(f"使用快取的 {len(cached[1])} 種語言設定")
+                return dict(cached[1])
+        
         connection = None
         cursor = None
         try:
@@ -65,36 +237,22 @@ class ReviewTranslator:
             cursor.execute(query)
             languages = cursor.fetchall()
             
-            # 建立語言對應表
-            for lang in languages:
-                lang_code = lang['lang_code']
-                lang_name = lang['lang_name']
-                
-                if lang_code == 'en':
-                    self.language_mapping[lang_code] = 'English'
-                elif lang_code == 'ja':
-                    self.language_mapping[lang_code] = 'Japanese'
-                elif lang_code == 'ko':
-                    self.language_mapping[lang_code] = 'Korean'
-                elif lang_code == 'zh':
-                    self.language_mapping[lang_code] = 'Traditional Chinese (Taiwan)'
-                elif lang_code == 'zh-Hant':
-                    self.language_mapping[lang_code] = 'Traditional Chinese (Taiwan)'
-                else:
-                    self.language_mapping[lang_code] = lang_name
+            # 建立語言對應表，常用語言改用固定的英文名稱
+            language_mapping = {
+                lang['lang_code']: self._LANG_OVERRIDES.get(lang['lang_code'], lang['lang_name'])
+                for lang in languages
+            }
             
-            logger.info(f"成功載入 {len(self.language_mapping)} 種語言設定")
+            with _language_mapping_lock:
+                _language_mapping_cache[cache_key] = (time.monotonic(), dict(language_mapping))
+            
+            logger.info(f"成功載入 {len(language_mapping)} 種語言設定")
+            return language_mapping
             
         except Error as e:
             logger.error(f"載入語言設定失敗: {e}")
             # 使用預設語言設定
-            self.language_mapping = {
-                'en': 'English',
-                'ja': 'Japanese', 
-                'ko': 'Korean',
-                'zh-Hant': 'Traditional Chinese (Taiwan)',
-                'zh': 'Traditional Chinese (Taiwan)'
-            }
+            return dict(self._LANG_OVERRIDES)
         finally:
             if cursor:
                 cursor.close()
@@ -148,6 +306,207 @@ class ReviewTranslator:
                 pass
             return ""
     
+    def _generate_content(self, prompt, generation_config, stream=False):
+        """呼叫 Gemini API，帶逾時設定並對暫時性錯誤做指數退避重試"""
+        for attempt in range(1, self.max_retries + 1):
+            # RPM 與 TPM 兩個 bucket 都有額度時才送出請求
+            self.rate_limiter.acquire()
+            self.token_limiter.acquire(0)
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    stream=stream,
+                    request_options={"timeout": self.request_timeout}
+                )
+                self.rate_limiter.recover()
+                
+                # 串流回應要讀完後才有用量資訊，由呼叫端記錄
+                if not stream:
+                    self._record_usage(response)
+                return response
+                
+            except RETRYABLE_EXCEPTIONS as e:
+                if isinstance(e, google_exceptions.ResourceExhausted):
+                    self.rate_limiter.throttle()
+                if attempt >= self.max_retries:
+                    raise
+                
+                wait_time = min(30, 2 ** (attempt - 1)) + random.uniform(0, 1)
+                logger.warning(f"Gemini API 暫時性錯誤 (第 {attempt} 次): {e}，{wait_time:.1f} 秒後重試")
+                time.sleep(wait_time)
+    
+    def _record_usage(self, response):
+        """記錄 token 用量並扣除 TPM 額度；回應缺少用量資訊時略過"""
+        try:
+            usage = getattr(response, 'usage_metadata', None)
+        except Exception as e:
+            logger.warning(f"無法取得 Gemini token 用量: {e}")
+            return
+        if usage and usage.total_token_count:
+            self.token_limiter.consume(usage.total_token_count)
+            logger.info(
+                f"Gemini token 用量: 輸入 {usage.prompt_token_count}, "
+                f"輸出 {usage.candidates_token_count}, 總計 {usage.total_token_count}"
+            )
+    
+    def _stream_translation(self, prompt, max_chars):
+        """以串流方式取得翻譯，超過長度上限或出現開場白時提前中止
+        
+        回傳 (翻譯文字, 是否因開場白中止)；長度超限時翻譯文字為空字串
+        """
+        response = self._generate_content(
+            prompt,
+            generation_config={
+                "max_output_tokens": MAX_OUTPUT_TOKENS_PER_LANGUAGE,
+                "temperature": 0.2
+            },
+            stream=True
+        )
+        
+        text_parts = []
+        length = 0
+        preamble_checked = False
+        completed = False
+        try:
+            for chunk in response:
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    continue
+                
+                text_parts.append(chunk_text)
+                length += len(chunk_text)
+                
+                if not preamble_checked and length >= PREAMBLE_CHECK_CHARS:
+                    preamble_checked = True
+                    if ''.join(text_parts).lstrip().startswith(TRANSLATION_PREAMBLES):
+                        logger.warning("翻譯結果出現開場白，提前中止串流")
+                        return "", True
+                
+                if length > max_chars:
+                    logger.warning(f"翻譯結果超過長度上限 {max_chars} 字符，提前中止串流")
+                    return "", False
+            
+            completed = True
+            return ''.join(text_parts), False
+        finally:
+            # 提前中止時關閉串流，讓伺服器停止生成
+            if not completed:
+                self._close_stream(response)
+            # 不論是否提前中止，已生成的 token 都要計入 TPM 額度（串流中每個區塊都帶有目前的用量）
+            self._record_usage(response)
+    
+    def _close_stream(self, response):
+        """關閉尚未讀完的串流回應"""
+        # SDK 未提供公開的關閉方法，改為取消底層的串流迭代器
+        iterator = getattr(response, '_iterator', None)
+        for method_name in ('cancel', 'close'):
+            method = getattr(iterator, method_name, None)
+            if callable(method):
+                try:
+                    method()
+                except Exception as e:
+                    logger.warning(f"關閉 Gemini 串流失敗: {e}")
+                return
+    
+    def _hash_source(self, review_summary):
+        """計算原文的 sha256 作為翻譯快取鍵"""
+        return hashlib.sha256(review_summary.encode('utf-8')).hexdigest()
+    
+    def _get_cached_translations(self, source_hash, lang_codes, connection=None):
+        """依序查詢行程內 LRU 與資料庫 translation_cache 表，回傳命中的翻譯"""
+        cached = {}
+        with _translation_cache_lock:
+            for lang_code in lang_codes:
+                key = (source_hash, lang_code)
+                if key in _translation_cache:
+                    _translation_cache.move_to_end(key)
+                    cached[lang_code] = _translation_cache[key]
+        
+        missing = [lang_code for lang_code in lang_codes if lang_code not in cached]
+        if not missing:
+            return cached
+        
+        own_connection = connection is None
+        cursor = None
+        try:
+            if own_connection:
+                connection = self.db_pool.get_connection()
+            cursor = connection.cursor(dictionary=True)
+            
+            placeholders = ', '.join(['%s'] * len(missing))
+            query = f"""
+                SELECT language_code, translated_text FROM translation_cache
+                WHERE source_hash = %s AND language_code IN ({placeholders})
+            """
+            cursor.execute(query, (source_hash, *missing))
+            rows = cursor.fetchall()
+            
+            db_hits = {row['language_code']: row['translated_text'] for row in rows}
+            self._remember_translations(source_hash, db_hits)
+            cached.update(db_hits)
+            
+        except Error as e:
+            logger.warning(f"查詢翻譯快取失敗: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+            if own_connection and connection:
+                connection.close()
+        
+        return cached
+    
+    def _store_cached_translations(self, source_hash, translations, connection=None):
+        """將新翻譯寫入行程內 LRU 與資料庫 translation_cache 表"""
+        if not translations:
+            return
+        
+        self._remember_translations(source_hash, translations)
+        
+        own_connection = connection is None
+        cursor = None
+        try:
+            if own_connection:
+                connection = self.db_pool.get_connection()
+            cursor = connection.cursor()
+            
+            query = """
+                INSERT INTO translation_cache (
+                    source_hash, language_code, translated_text
+                ) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                translated_text = VALUES(translated_text);
+            """
+            rows = [
+                (source_hash, lang_code, translation)
+                for lang_code, translation in translations.items()
+            ]
+            cursor.executemany(query, rows)
+            # 共用連線時由呼叫端統一提交
+            if own_connection:
+                connection.commit()
+            
+        except Error as e:
+            logger.warning(f"寫入翻譯快取失敗: {e}")
+            if own_connection and connection:
+                connection.rollback()
+        finally:
+            if cursor:
+                cursor.close()
+            if own_connection and connection:
+                connection.close()
+    
+    def _remember_translations(self, source_hash, translations):
+        """寫入行程內 LRU 快取，超過容量時淘汰最久未使用的項目"""
+        with _translation_cache_lock:
+            for lang_code, translation in translations.items():
+                key = (source_hash, lang_code)
+                _translation_cache[key] = translation
+                _translation_cache.move_to_end(key)
+            while len(_translation_cache) > TRANSLATION_CACHE_SIZE:
+                _translation_cache.popitem(last=False)
+    
     def translate_review_summary(self, review_summary, target_lang_code):
         """翻譯評論摘要"""
         try:
@@ -159,33 +518,34 @@ class ReviewTranslator:
                 logger.info(f"目標語言為繁體中文 ({target_lang_code})，直接返回原文")
                 return review_summary
             
+            source_hash = self._hash_source(review_summary)
+            cached = self._get_cached_translations(source_hash, [target_lang_code])
+            if target_lang_code in cached:
+                logger.info(f"命中翻譯快取 ({target_lang_code})，跳過 Gemini API")
+                return cached[target_lang_code]
+            
             target_language = self.language_mapping.get(target_lang_code, target_lang_code)
             
-            prompt = f"""
-請將以下繁體中文的餐廳評論摘要翻譯成{target_language}，保持原有格式和結構，不要加任何前言或說明：
-
-{review_summary}
-
-翻譯要求：
-1. 保持原有的標題格式（## 標題）
-2. 保持菜品Top5的編號格式
-3. 翻譯要自然流暢，符合目標語言的表達習慣
-4. 菜品名稱可以保留中文並加上{target_language}翻譯
-5. 數字和統計資訊保持不變
-6. 使用專業的餐廳評論術語
-7. 直接輸出分析報告，不要有「好的，這是...」等開場白
-"""
+            prompt = TRANSLATION_PROMPT_TEMPLATE.format(
+                target_language=target_language,
+                review_summary=review_summary
+            )
             
             logger.info(f"開始翻譯評論摘要到 {target_language} ({target_lang_code})")
             
-            response = self.model.generate_content(prompt)
-            
-            translated_text = self._extract_response_text(response)
+            max_chars = max(len(review_summary) * 6, 2000)
+            translated_text, has_preamble = self._stream_translation(prompt, max_chars)
+            if has_preamble:
+                # 出現「好的，這是...」等開場白時，以更嚴格的提示詞重試一次
+                translated_text, _ = self._stream_translation(
+                    prompt + STRICT_PROMPT_SUFFIX, max_chars
+                )
             
             if translated_text:
                 translated_text = translated_text.strip()
                 logger.info(f"成功翻譯評論摘要到 {target_language}")
                 logger.debug(f"翻譯結果長度: {len(translated_text)} 字符")
+                self._store_cached_translations(source_hash, {target_lang_code: translated_text})
                 return translated_text
             else:
                 logger.error(f"Gemini API 翻譯失敗，沒有返回有效結果")
@@ -197,8 +557,118 @@ class ReviewTranslator:
             logger.error(f"詳細錯誤資訊: {traceback.format_exc()}")
             return ""
     
+    def translate_review_summary_multi(self, review_summary, target_lang_codes, connection=None):
+        """以單一 Gemini 請求將評論摘要翻譯成多種語言，回傳 {語言代碼: 翻譯}"""
+        # 已從快取取得的翻譯在任何錯誤時都要一併回傳，避免呼叫端再次送去翻譯
+        cached = {}
+        try:
+            if not review_summary or not review_summary.strip():
+                logger.warning("評論摘要為空，跳過翻譯")
+                return {}
+            
+            # 繁體中文直接使用原文，不需送入 Gemini
+            lang_codes = [
+                lang_code for lang_code in target_lang_codes
+                if lang_code not in ('zh-Hant', 'zh')
+            ]
+            if not lang_codes:
+                return {}
+            
+            source_hash = self._hash_source(review_summary)
+            cached = self._get_cached_translations(source_hash, lang_codes, connection=connection)
+            if cached:
+                logger.info(f"命中翻譯快取 {len(cached)} 種語言，跳過 Gemini API")
+            
+            lang_codes = [lang_code for lang_code in lang_codes if lang_code not in cached]
+            if not lang_codes:
+                return cached
+            
+            language_lines = "\n".join(
+                f"- {lang_code}: {self.language_mapping.get(lang_code, lang_code)}"
+                for lang_code in lang_codes
+            )
+            
+            prompt = MULTI_TRANSLATION_PROMPT_TEMPLATE.format(
+                language_lines=language_lines,
+                review_summary=review_summary
+            )
+            
+            logger.info(f"開始以單一請求翻譯評論摘要到 {len(lang_codes)} 種語言")
+            
+            response = self._generate_content(
+                prompt,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "max_output_tokens": min(
+                        MAX_OUTPUT_TOKENS_PER_LANGUAGE * len(lang_codes),
+                        MAX_OUTPUT_TOKENS
+                    ),
+                    "temperature": 0.2
+                }
+            )
+            
+            response_text = self._extract_response_text(response)
+            if not response_text:
+                logger.error("Gemini API 多語言翻譯失敗，沒有返回有效結果")
+                return cached
+            
+            data = json.loads(response_text)
+            if not isinstance(data, dict):
+                logger.error("Gemini API 多語言翻譯結果不是 JSON 物件")
+                return cached
+            
+            results = {}
+            for lang_code in lang_codes:
+                translation = data.get(lang_code)
+                if isinstance(translation, str) and translation.strip():
+                    results[lang_code] = translation.strip()
+            
+            logger.info(f"單一請求成功翻譯 {len(results)}/{len(lang_codes)} 種語言")
+            self._store_cached_translations(source_hash, results, connection=connection)
+            results.update(cached)
+            return results
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"解析 Gemini 多語言翻譯 JSON 失敗: {e}")
+            return cached
+        except Exception as e:
+            logger.error(f"多語言翻譯評論摘要時發生錯誤: {e}")
+            import traceback
+            logger.error(f"詳細錯誤資訊: {traceback.format_exc()}")
+            return cached
+    
+    def _translate_for_batch(self, review_summary, target_lang_code):
+        """翻譯單一語言（供執行緒池使用）"""
+        logger.info(f"正在翻譯到 {self.language_mapping.get(target_lang_code, target_lang_code)} ({target_lang_code})")
+        return self.translate_review_summary(review_summary, target_lang_code)
+    
+    def _acquire_store_lock(self, connection, store_id):
+        """取得店家翻譯的 MySQL advisory lock，避免多個工作程序重複翻譯同一店家"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (f'translate_{store_id}', self.lock_timeout))
+            result = cursor.fetchone()
+            return bool(result and result[0] == 1)
+        finally:
+            cursor.close()
+    
+    def _release_store_lock(self, connection, store_id):
+        """釋放店家翻譯的 advisory lock"""
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (f'translate_{store_id}',))
+            cursor.fetchone()
+        except Error as e:
+            logger.warning(f"釋放店家 {store_id} 翻譯鎖失敗: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+    
     def batch_translate_and_save(self, store_id, review_summary):
         """批量翻譯並儲存到資料庫"""
+        connection = None
+        lock_acquired = False
         try:
             if not review_summary or not review_summary.strip():
                 logger.warning("評論摘要為空，跳過批量翻譯")
@@ -210,47 +680,97 @@ class ReviewTranslator:
                 #if lang_code != 'zh'
             ]
             
-            logger.info(f"開始批量翻譯店家 {store_id} 到 {len(target_languages)} 種語言")
-            
             translations = {}
             success_count = 0
             fail_count = 0
             
-            for lang_code in target_languages:
-                try:
-                    lang_name = self.language_mapping[lang_code]
-                    logger.info(f"正在翻譯到 {lang_name} ({lang_code})")
-                    
-                    translation = self.translate_review_summary(review_summary, lang_code)
+            # 整個批次共用同一條連線，最後統一提交
+            connection = self.db_pool.get_connection()
+            
+            source_hash = self._hash_source(review_summary)
+            
+            # 同一店家同時只允許一個工作程序翻譯；等待逾時則只沿用由相同原文翻譯而來的結果，
+            # 避免把對方尚未寫完前或舊摘要的翻譯交給呼叫端寫回，覆蓋對方剛儲存的內容。
+            # 若等到鎖，先前的翻譯已寫入 translation_cache，後續查詢會直接命中快取。
+            lock_acquired = self._acquire_store_lock(connection, store_id)
+            if not lock_acquired:
+                logger.info(f"店家 {store_id} 正由其他工作程序翻譯中，僅沿用已是最新的翻譯結果")
+                return self._get_up_to_date_translations(store_id, source_hash, connection=connection)
+            
+            # 已依相同原文翻譯過的語言直接沿用，不再呼叫 Gemini 或重寫資料庫
+            up_to_date = self._get_up_to_date_translations(store_id, source_hash, connection=connection)
+            translations.update(up_to_date)
+            target_languages = [
+                lang_code for lang_code in target_languages if lang_code not in up_to_date
+            ]
+            if up_to_date:
+                logger.info(f"店家 {store_id} 已有 {len(up_to_date)} 種語言的最新翻譯，跳過")
+            
+            logger.info(f"開始批量翻譯店家 {store_id} 到 {len(target_languages)} 種語言")
+            
+            # 繁體中文直接使用原文（僅限語言表中有的代碼），其餘語言先以單一 Gemini 請求取得翻譯
+            source_languages = [
+                lang_code for lang_code in ('zh-Hant', 'zh') if lang_code in self.language_mapping
+            ]
+            results = {lang_code: review_summary for lang_code in source_languages}
+            results.update(self.translate_review_summary_multi(
+                review_summary, target_languages, connection=connection
+            ))
+            
+            # 缺漏或無效的語言才退回逐一翻譯，各語言互不相依，以執行緒池並行呼叫 Gemini
+            remaining_languages = [
+                lang_code for lang_code in target_languages if lang_code not in results
+            ]
+            if remaining_languages:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = {
+                        executor.submit(self._translate_for_batch, review_summary, lang_code): lang_code
+                        for lang_code in remaining_languages
+                    }
                     
-                    if translation:
-                        if self._save_translation_to_db(store_id, lang_code, translation):
+                    for future in as_completed(futures):
+                        lang_code = futures[future]
+                        try:
+                            results[lang_code] = future.result()
+                        except Exception as e:
+                            logger.error(f"處理語言 {lang_code} 時發生錯誤: {e}")
+                            results[lang_code] = ""
+            
+            # 翻譯結果先收集在記憶體中（含繁體中文原文），最後一次批次寫入資料庫
+            pending_translations = {
+                lang_code: review_summary
+                for lang_code in source_languages if lang_code not in up_to_date
+            }
+            for lang_code in target_languages:
+                translation = results.get(lang_code)
+                
+                if translation:
+                    pending_translations[lang_code] = translation
+                else:
+                    logger.warning(f"翻譯到 {self.language_mapping[lang_code]} 失敗")
+                    fail_count += 1
+            
+            if pending_translations:
+                if self._save_translations_bulk(
+                    store_id, pending_translations, source_hash, connection=connection
+                ):
+                    translations.update(pending_translations)
+                    logger.info(f"成功翻譯並儲存 {len(pending_translations)} 種語言")
+                    success_count += len(pending_translations)
+                else:
+                    # 批次寫入失敗時逐筆重試，避免單一無效語言代碼拖累整批翻譯
+                    logger.warning(f"批次儲存失敗，改為逐筆儲存: {', '.join(pending_translations)}")
+                    for lang_code, translation in pending_translations.items():
+                        if self._save_translations_bulk(
+                            store_id, {lang_code: translation}, source_hash, connection=connection
+                        ):
                             translations[lang_code] = translation
-                            logger.info(f"成功翻譯並儲存到 {lang_name}")
                             success_count += 1
                         else:
-                            logger.warning(f"翻譯成功但儲存失敗: {lang_name}")
+                            logger.warning(f"翻譯成功但儲存失敗: {lang_code}")
                             fail_count += 1
-                    else:
-                        logger.warning(f"翻譯到 {lang_name} 失敗")
-                        fail_count += 1
-                    
-                    import time
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    logger.error(f"處理語言 {lang_code} 時發生錯誤: {e}")
-                    fail_count += 1
-                    continue
             
-            if self._save_translation_to_db(store_id, 'zhh-Hant', review_summary):
-                translations['zh-Hant'] = review_summary
-                logger.info("成功儲存原文（繁體中文）")
-                success_count += 1
-            elif self._save_translation_to_db(store_id, 'zh', review_summary):
-                translations['zh'] = review_summary
-                logger.info("成功儲存原文（繁體中文）")
-                success_count += 1
+            connection.commit()
             
             logger.info(f"批量翻譯完成，成功 {success_count} 種語言，失敗 {fail_count} 種語言")
             return translations
@@ -259,48 +779,91 @@ class ReviewTranslator:
             logger.error(f"批量翻譯處理失敗: {e}")
             import traceback
             logger.error(f"詳細錯誤資訊: {traceback.format_exc()}")
+            if connection:
+                connection.rollback()
             return {}
+        finally:
+            if connection:
+                if lock_acquired:
+                    self._release_store_lock(connection, store_id)
+                connection.close() # 歸還連線到連線池
     
-    def _save_translation_to_db(self, store_id, lang_code, translation):
-        """將翻譯結果儲存到資料庫"""
-        connection = None
+    def _save_translations_bulk(self, store_id, translations, source_hash=None, connection=None):
+        """將多種語言的翻譯結果以單一 executemany 批次儲存到資料庫"""
+        own_connection = connection is None
         cursor = None
         try:
-            connection = self.db_pool.get_connection()
+            if own_connection:
+                connection = self.db_pool.get_connection()
             cursor = connection.cursor()
-
-            # 使用 ON DUPLICATE KEY UPDATE 以實現存在即更新，不存在即插入
+            
             query = """
                 INSERT INTO store_translations (
-                    store_id, language_code, translated_summary
-                ) VALUES (%s, %s, %s)
+                    store_id, language_code, translated_summary, source_hash
+                ) VALUES (%s, %s, %s, %s)
                 ON DUPLICATE KEY UPDATE
-                translated_summary = VALUES(translated_summary);
+                translated_summary = VALUES(translated_summary),
+                source_hash = VALUES(source_hash);
             """
-            cursor.execute(query, (store_id, lang_code, translation))
+            rows = [
+                (store_id, lang_code, translation, source_hash)
+                for lang_code, translation in translations.items()
+            ]
+            cursor.executemany(query, rows)
             
-            connection.commit()
-            logger.debug(f"成功儲存或更新店家 {store_id} 語言 {lang_code} 的翻譯")
+            # 共用連線時由呼叫端統一提交
+            if own_connection:
+                connection.commit()
+            logger.debug(f"成功批次儲存或更新店家 {store_id} 的 {len(rows)} 筆翻譯")
             return True
             
         except Error as e:
-            logger.error(f"儲存翻譯到資料庫失敗: {e}")
-            if connection:
+            logger.error(f"批次儲存翻譯到資料庫失敗: {e}")
+            if own_connection and connection:
                 connection.rollback()
             return False
         finally:
             if cursor:
                 cursor.close()
-            if connection:
+            if own_connection and connection:
                 connection.close() # 歸還連線到連線池
     
+    def _get_up_to_date_translations(self, store_id, source_hash, connection=None):
+        """取得店家中由相同原文（source_hash 相符）翻譯而來的語言"""
+        own_connection = connection is None
+        cursor = None
+        try:
+            if own_connection:
+                connection = self.db_pool.get_connection()
+            cursor = connection.cursor(prepared=True)
+            
+            query = """
+                SELECT language_code, translated_summary FROM store_translations
+                WHERE store_id = %s AND source_hash = %s
+            """
+            cursor.execute(query, (store_id, source_hash))
+            return {
+                lang_code: translated_summary
+                for lang_code, translated_summary in cursor.fetchall()
+                if translated_summary
+            }
+            
+        except Error as e:
+            logger.warning(f"查詢店家 {store_id} 既有翻譯失敗: {e}")
+            return {}
+        finally:
+            if cursor:
+                cursor.close()
+            if own_connection and connection:
+                connection.close()
+    
     def get_translation_from_db(self, store_id, lang_code):
         """從資料庫取得翻譯"""
         connection = None
         cursor = None
         try:
             connection = self.db_pool.get_connection()
-            cursor = connection.cursor(dictionary=True)
+            cursor = connection.cursor(prepared=True)
             
             query = """
                 SELECT translated_summary FROM store_translations 
@@ -310,7 +873,7 @@ class ReviewTranslator:
             result = cursor.fetchone()
             
             if result:
-                return result['translated_summary']
+                return result[0]
             else:
                 logger.info(f"找不到店家 {store_id} 語言 {lang_code} 的翻譯")
                 return None
@@ -330,22 +893,24 @@ class ReviewTranslator:
         cursor = None
         try:
             connection = self.db_pool.get_connection()
-            cursor = connection.cursor(dictionary=True)
+            cursor = connection.cursor(prepared=True)
             
+            # 語言名稱直接由記憶體中的語言對應表解析，不再 JOIN languages 表
             query = """
-                SELECT st.language_code, st.translated_summary, l.lang_name
-                FROM store_translations st
-                JOIN languages l ON st.language_code = l.line_lang_code
-                WHERE st.store_id = %s
+                SELECT language_code, translated_summary
+                FROM store_translations
+                WHERE store_id = %s
             """
             cursor.execute(query, (store_id,))
             results = cursor.fetchall()
             
             translations = {}
-            for row in results:
-                translations[row['language_code']] = {
-                    'translation': row['translated_summary'],
-                    'lang_name': row['lang_name']
+            for lang_code, translated_summary in results:
+                if lang_code not in self.language_mapping:
+                    continue
+                translations[lang_code] = {
+                    'translation': translated_summary,
+                    'lang_name': self.language_mapping[lang_code]
                 }
             
             logger.info(f"取得店家 {store_id} 的 {len(translations)} 種語言翻譯")
@@ -383,12 +948,12 @@ class ReviewTranslator:
             return True  # 驗證失敗時預設為通過
     
     def get_supported_languages(self):
-        """取得支援的語言列表"""
-        return list(self.language_mapping.keys())
+        """取得支援的語言列表（唯讀 tuple）"""
+        return self._supported_languages
     
     def is_language_supported(self, lang_code):
         """檢查是否支援特定語言"""
-        return lang_code in self.language_mapping.keys()
+        return lang_code in self._supported_language_set
     
     def close_pool(self):
         """關閉連線池 (實際上不做任何事，因為連線池會在程式結束時自動釋放)"""
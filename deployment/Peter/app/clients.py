@@ -8,6 +8,11 @@ import logging
 from google.api_core.exceptions import ClientError, GoogleAPICallError
 # 從 Google Cloud Translate V2 函式庫中導入 `translate` 模組，並將其別名為 `translate` 以方便使用。
 from google.cloud import translate_v2 as translate
+# 導入 Google Cloud Translate V3 函式庫，用於建立原生非同步的翻譯客戶端。
+from google.cloud import translate_v3
+
+# 從本地模組導入設定，用於取得 GCP 專案資訊。
+from .config import Config
 
 # 取得一個日誌記錄器（logger）實例。
 # 參數 "uvicorn.error" 表示這個 logger 會整合到 uvicorn 伺服器的錯誤日誌系統中。
@@ -42,4 +47,29 @@ def initialize_google_clients():
         # 記錄一條警告訊息，告知開發者或維運人員，機器人將在功能降級的模式下運行（翻譯功能將不可用）。
         logger.warning("Bot will run in degraded mode (translation features disabled).")
         # 返回 False，讓呼叫此函式的地方可以根據返回值判斷初始化是否成功，並作出相應的處理。
-        return False
\ No newline at end of file
+        return False
+
+
+# 定義一個非同步函式，用於初始化 Translation API v3 的非同步客戶端。
+async def initialize_translate_client():
+    # 如果沒有設定 GCP 專案 ID，無法使用 v3 API，退回同步的 v2 客戶端。
+    if not Config.TRANSLATE_PARENT:
+        logger.info("GOOGLE_CLOUD_PROJECT is not set. Falling back to Translate API v2 client.")
+        return initialize_google_clients()
+
+    try:
+        logger.info("Initializing Google Translate API v3 async client...")
+        # 建立 v3 的非同步客戶端，它的請求直接在事件循環上執行，不需要佔用背景執行緒。
+        translate_client_instance = translate_v3.TranslationServiceAsyncClient()
+
+        # 與 v2 相同，先以一個簡單的 API 呼叫驗證認證與連線是否正常。
+        await translate_client_instance.get_supported_languages(
+            request={"parent": Config.TRANSLATE_PARENT, "display_language_code": "en"}
+        )
+
+        logger.info("Google Translate API v3 async client initialized successfully.")
+        return translate_client_instance
+    except (GoogleAPICallError, ClientError, Exception) as e:
+        # v3 初始化失敗時記錄錯誤，並嘗試退回 v2 客戶端。
+        logger.error(f"Failed to initialize Google Translate API v3 client: {e}", exc_info=True)
+        return initialize_google_clients()
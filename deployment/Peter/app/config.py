@@ -35,6 +35,23 @@ class Config:
     # --- Google Maps API 設定 ---
     MAPS_API_KEY = os.environ.get("MAPS_API_KEY") # 從環境變數中讀取 Google Maps API 金鑰，為可選設定。
 
+    # --- Google Cloud Translation 設定 ---
+    # 從環境變數中讀取 GCP 專案 ID，為可選設定。
+    # 有設定時會改用 Translation API v3 的原生非同步客戶端，否則沿用 v2 客戶端。
+    GOOGLE_CLOUD_PROJECT = os.environ.get("GOOGLE_CLOUD_PROJECT")
+    # Translation API v3 請求所需的 `parent` 資源名稱。
+    TRANSLATE_PARENT = (
+        f"projects/{GOOGLE_CLOUD_PROJECT}/locations/global" if GOOGLE_CLOUD_PROJECT else None
+    )
+
+    # 範本翻譯結果的磁碟快取檔案路徑，應用程式重新啟動時可直接載入，不必重新呼叫翻譯 API。
+    # 預設放在專案目錄下的 `cache/`；容器部署時 Dockerfile 會將此變數指向 `/app/cache`，
+    # 需在該路徑掛載持久化磁碟區（例如 Cloud Run 的 Cloud Storage 磁碟區），快取才能跨實例保留。
+    TEMPLATE_TRANSLATION_CACHE_PATH = os.environ.get(
+        "TEMPLATE_TRANSLATION_CACHE_PATH",
+        os.path.join(project_root, "cache", "reply_template_translations.json"),
+    )
+
     # --- 應用程式通用設定 ---
     # 從環境變數中讀取應用程式的公開基礎 URL，例如 `https://your-domain.com`。
     # 這個設定可能用於產生絕對路徑的 URL（例如圖片連結），是一個可選設定。
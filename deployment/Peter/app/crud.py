@@ -7,16 +7,37 @@ from typing import List, Optional, Sequence
 # 從 `sqlalchemy` 模組導入 `desc` 和 `select`。
 # `desc`: 用於指定查詢結果以降序 (descending) 排序。
 # `select`: 在 SQLAlchemy 2.0 風格中，用於建立 SELECT 查詢語句的核心函式。
-from sqlalchemy import desc, select
+# `update`: 用於建立 UPDATE 語句的核心函式。
+# `bindparam`: 用於在查詢語句中建立具名的參數佔位符，執行時再代入實際的值。
+from sqlalchemy import bindparam, desc, select, update
+# MySQL 方言的 `insert` 支援 `on_duplicate_key_update()`，可將「新增或更新」合併為單一語句。
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 # 從 SQLAlchemy 的 asyncio 擴充套件導入 `AsyncSession`，這是執行非同步資料庫操作的會話物件型別。
 from sqlalchemy.ext.asyncio import AsyncSession
 # 從 SQLAlchemy 的 ORM 模組導入 `joinedload`。
 # `joinedload` 是一種查詢選項，用於「預先載入」(Eager Loading) 關聯的物件。
 # 它可以透過一個 JOIN 查詢一次性取得主物件和其關聯物件，從而有效避免 "N+1 查詢問題"，提升效能。
-from sqlalchemy.orm import joinedload
+# `raiseload` 則讓未預先載入的關聯在被存取時直接拋出例外，避免在非同步會話中觸發隱式的延遲載入。
+# `load_only` 用於限制查詢只載入指定的欄位，略過用不到的大型欄位。
+from sqlalchemy.orm import joinedload, load_only, raiseload
+# `set_committed_value` 可直接設定物件屬性的「已提交」值，不會將物件標記為需要再次寫入資料庫。
+from sqlalchemy.orm.attributes import set_committed_value
 
 # 從同層級的 `models` 模組中導入所有 ORM 模型類別。
-from .models import Language, Order, Store, StoreTranslation, User
+from .models import Language, Order, OrderItem, Store, StoreTranslation, User
+
+
+# 依 LINE User ID 查詢使用者的查詢語句，在模組載入時建立一次。
+# `line_user_id` 不是主鍵（主鍵為 `user_id`），無法使用 `db.get()`；
+# 改以具名參數 `line_user_id` 在執行時代入，省去每次呼叫都重新建構查詢物件的開銷。
+_USER_BY_LINE_ID_STMT = (
+    select(User)
+    # 使用 .options(joinedload(...)) 來預先載入與 User 相關的 Language 物件。
+    # 這樣在後續存取 `user.language` 時，就不需要再發起一次新的資料庫查詢。
+    .options(joinedload(User.language))
+    # 加入 WHERE 條件，篩選出 `line_user_id` 符合指定值的記錄。
+    .where(User.line_user_id == bindparam("line_user_id"))
+)
 
 
 async def get_user_by_line_id(
@@ -25,17 +46,8 @@ async def get_user_by_line_id(
     """
     根據 LINE User ID 查詢使用者資料。
     """
-    # 建立一個查詢語句，選擇 User 物件。
-    stmt = (
-        select(User)
-        # 使用 .options(joinedload(...)) 來預先載入與 User 相關的 Language 物件。
-        # 這樣在後續存取 `user.language` 時，就不需要再發起一次新的資料庫查詢。
-        .options(joinedload(User.language))
-        # 加入 WHERE 條件，篩選出 `line_user_id` 符合指定值的記錄。
-        .filter_by(line_user_id=line_user_id)
-    )
-    # 非同步地執行查詢語句。
-    result = await db.execute(stmt)
+    # 非同步地執行預先建立的查詢語句，並代入 LINE User ID。
+    result = await db.execute(_USER_BY_LINE_ID_STMT, {"line_user_id": line_user_id})
     # `scalar_one_or_none()`: 處理查詢結果。它預期最多只會有一筆結果。
     # 如果找到一筆，就返回該筆結果的第一個欄位（在這裡就是 User 物件本身）。
     # 如果沒有找到結果，就返回 `None`。
@@ -82,6 +94,50 @@ async def update_user(db: AsyncSession, user: User, **kwargs) -> User:
     return user
 
 
+async def update_user_language(
+    db: AsyncSession, user: User, preferred_lang: str, state: str = "normal"
+) -> User:
+    """
+    更新使用者的偏好語言與狀態。
+    與 `update_user` 不同，這裡直接以一句 UPDATE 語句寫入，不需要 `user` 屬於目前的 Session，
+    也不需要在提交後再 `refresh` 一次，整個更新只需一次資料庫往返。
+    若使用者的語言與狀態已是目標值（例如重複點選同一個語言），則不發出任何資料庫請求。
+    """
+    if user.preferred_lang == preferred_lang and user.state == state:
+        return user
+    await db.execute(
+        update(User)
+        .where(User.user_id == user.user_id)
+        .values(preferred_lang=preferred_lang, state=state)
+    )
+    await db.commit()
+    # 同步記憶體中的物件狀態，讓後續的訊息能以新語言產生。
+    set_committed_value(user, "preferred_lang", preferred_lang)
+    set_committed_value(user, "state", state)
+    return user
+
+
+async def upsert_user(
+    db: AsyncSession, line_user_id: str, preferred_lang: str
+) -> User:
+    """
+    新增使用者，若 `line_user_id` 已存在則更新其偏好語言並將狀態重設為 "normal"。
+    以單一 `INSERT ... ON DUPLICATE KEY UPDATE` 語句完成，不需先查詢使用者是否存在，
+    同一使用者的多個加入好友事件同時抵達時，也不會因唯一鍵衝突而失敗。
+    """
+    stmt = mysql_insert(User).values(
+        line_user_id=line_user_id, preferred_lang=preferred_lang, state="normal"
+    )
+    await db.execute(
+        stmt.on_duplicate_key_update(
+            preferred_lang=stmt.inserted.preferred_lang, state=stmt.inserted.state
+        )
+    )
+    await db.commit()
+    # 寫入後以預先建立的查詢語句取回使用者（連同其 Language 關聯），供後續產生訊息使用。
+    return await get_user_by_line_id(db, line_user_id)
+
+
 async def get_stores_by_place_ids(
     db: AsyncSession, place_ids: List[str]
 ) -> Sequence[Store]:
@@ -91,7 +147,20 @@ async def get_stores_by_place_ids(
     # 建立查詢語句，選擇 Store 物件。
     # `.where(Store.place_id.in_(place_ids))` 加入 WHERE 條件，使用 `IN` 子句來一次性查詢所有 `place_id` 在列表中的店家。
     # 這比迴圈中逐一查詢要高效得多。
-    stmt = select(Store).where(Store.place_id.in_(place_ids))
+    # 店家輪播與排序只會用到以下欄位，以 `load_only` 略過評論摘要、人氣菜色等 TEXT/VARCHAR 欄位。
+    stmt = (
+        select(Store)
+        .options(
+            load_only(
+                Store.store_id,
+                Store.store_name,
+                Store.partner_level,
+                Store.place_id,
+                Store.main_photo_url,
+            )
+        )
+        .where(Store.place_id.in_(place_ids))
+    )
     # 執行查詢。
     result = await db.execute(stmt)
     # `scalars()` 會從結果中提取每一行的第一個元素（即 Store 物件）。
@@ -99,14 +168,35 @@ async def get_stores_by_place_ids(
     return result.scalars().all()
 
 
-async def add_stores(db: AsyncSession, new_stores: List[Store]):
+# 新增店家時寫入的欄位
+_NEW_STORE_COLUMNS = (
+    "store_name",
+    "partner_level",
+    "gps_lat",
+    "gps_lng",
+    "place_id",
+    "main_photo_url",
+)
+
+
+async def add_stores(db: AsyncSession, new_stores: List[Store]) -> Sequence[Store]:
     """
-    將一批新的店家資料新增到資料庫。
+    將一批新的店家資料新增到資料庫，並返回寫入後（含資料庫產生的 `store_id`）的店家物件。
+
+    透過 ORM 的 `add_all()` 新增時，MySQL 不支援 RETURNING，SQLAlchemy 必須逐筆執行 INSERT 才能取得自動產生的主鍵。
+    這裡改以單一的多筆 INSERT 寫入，再以一次 `IN` 查詢取回所有店家，不論新增幾家店都只需兩次資料庫往返。
+    當其他請求已同時新增相同 `place_id` 的店家時，以 `ON DUPLICATE KEY UPDATE place_id = place_id` 略過重複的資料。
+    不使用 `INSERT IGNORE`，因為它也會把欄位過長、NOT NULL 等錯誤降級為警告，導致資料被靜默截斷或捨棄。
     """
-    # `db.add_all()` 是一個優化後的方法，可以一次性將一個列表中的所有 ORM 物件加入到 session 中。
-    db.add_all(new_stores)
+    rows = [
+        {column: getattr(store, column) for column in _NEW_STORE_COLUMNS}
+        for store in new_stores
+    ]
+    stmt = mysql_insert(Store.__table__)
+    await db.execute(stmt.on_duplicate_key_update(place_id=stmt.inserted.place_id), rows)
     # 提交交易，將所有新店家一次性寫入資料庫。
     await db.commit()
+    return await get_stores_by_place_ids(db, [store.place_id for store in new_stores])
 
 
 async def get_store_translation_summary(
@@ -139,7 +229,15 @@ async def get_order_details(
         # WHERE 條件：確保訂單 ID 和使用者 ID 都匹配，防止使用者查詢到不屬於自己的訂單。
         .where(Order.order_id == order_id, Order.user_id == user_id)
         # 預先載入關聯的 `store` 物件 (一對多關係的 "一") 和 `items` 列表 (一對多關係的 "多")。
-        .options(joinedload(Order.store), joinedload(Order.items))
+        # 訂單明細訊息只用到品項的原始名稱、數量與小計，以 `load_only` 只 SELECT 這些欄位（主鍵會自動包含）。
+        # `raiseload("*")` 讓其餘未預先載入的關聯在被存取時直接拋出例外，而不是在非同步會話中隱式發出額外查詢。
+        .options(
+            joinedload(Order.store),
+            joinedload(Order.items).load_only(
+                OrderItem.original_name, OrderItem.quantity_small, OrderItem.subtotal
+            ),
+            raiseload("*"),
+        )
     )
     # 執行查詢。
     result = await db.execute(stmt)
@@ -159,8 +257,8 @@ async def get_user_order_history(
     # 建立查詢語句，選擇 Order 物件。
     stmt = (
         select(Order)
-        # 預先載入每筆訂單關聯的店家資訊。
-        .options(joinedload(Order.store))
+        # 預先載入每筆訂單關聯的店家資訊，其餘關聯禁止延遲載入。
+        .options(joinedload(Order.store), raiseload("*"))
         # WHERE 條件：篩選出屬於該使用者的訂單。
         .where(Order.user_id == user_id)
         # 排序條件：根據訂單時間 (`order_time`) 進行倒序 (`desc`) 排列，讓最新的訂單在最前面。
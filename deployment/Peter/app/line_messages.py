@@ -1,14 +1,29 @@
 # 導入 asyncio 模組，用於非同步操作，如此處的 `asyncio.to_thread`。
 import asyncio
-# 導入 json 模組，用於處理 JSON 格式的資料，例如 PostbackAction 的 data 欄位。
-import json
+# 導入 hashlib 模組，用於計算範本內容的雜湊值。
+import hashlib
 # 導入 logging 模組，用於日誌記錄。
 import logging
+# 導入 os 模組，用於以原子方式取代磁碟快取檔案。
+import os
+# 導入 sys 模組，用於 `sys.intern` 字串駐留。
+import sys
+# 導入 OrderedDict，用於實作動態文字翻譯的 LRU 快取。
+from collections import OrderedDict
+# 導入 lru_cache，用於快取純函式的計算結果。
+from functools import lru_cache
+# 導入 MappingProxyType，用於建立唯讀的字典檢視。
+from types import MappingProxyType
 # 從 typing 模組導入型別提示。
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 # 從 urllib.parse 導入 quote，用於對 URL 中的特殊字元進行編碼，確保 URL 的正確性。
 from urllib.parse import quote
 
+# 導入 orjson，以 Rust 實作的高效能 JSON 序列化函式庫，用於產生 PostbackAction 的 data 欄位。
+import orjson
+# 導入 Google Cloud Translation API v3，用於判斷翻譯客戶端的類型。
+from google.cloud import translate_v3
+
 # 從 line-bot-sdk for python v3 中導入所有會用到的訊息類別和動作類別。
 # 這些類別對應到 LINE Messaging API 中各種不同的訊息格式。
 from linebot.v3.messaging import (
@@ -37,6 +52,13 @@ from .models import Order, Store, User
 # 取得 logger 實例。
 logger = logging.getLogger(__name__)
 
+
+def _dumps(obj: Any) -> str:
+    """
+    將物件序列化為 JSON 字串。`orjson.dumps` 返回 bytes，而 LINE SDK 的 postback data 需要 str，因此在此解碼。
+    """
+    return orjson.dumps(obj).decode()
+
 # 定義一個全域字典，儲存所有回覆訊息的文字範本。
 # 基礎語言為繁體中文。Key 是範本的識別碼，Value 是文字內容。
 # 使用 `{key}` 的格式來表示可被動態替換的變數。
@@ -72,6 +94,156 @@ REPLY_TEMPLATES = {
     "alt_text_store_list": "附近的店家列表",
     "alt_text_order_history": "您的歷史訂單",
 }
+# 範本在模組載入後即為唯讀：以 `MappingProxyType` 包裝以防止執行期間被意外修改（否則會讓翻譯快取失效），
+# 並將所有 key 字串 intern，讓呼叫端以字串常值查詢時能走指標比對的快速路徑。
+REPLY_TEMPLATES = MappingProxyType(
+    {sys.intern(key): text for key, text in REPLY_TEMPLATES.items()}
+)
+
+# 固定內容的 postback 資料，在模組載入時序列化一次，之後每次建立按鈕都直接重用同一個字串。
+ORDER_HISTORY_POSTBACK = _dumps({"action": ActionType.ORDER_HISTORY})
+CHANGE_LANGUAGE_POSTBACK = _dumps({"action": ActionType.CHANGE_LANGUAGE})
+
+# 語言選擇按鈕的 postback 資料只取決於語言代碼，依語言代碼快取序列化結果。
+_set_language_postbacks: Dict[str, str] = {}
+
+# 語言選擇 Flex Message 的快取，Key 為提示文字。
+# 語言列表與按鈕顯示文字在啟動後不再改變，訊息內容只取決於使用者語言的提示文字，
+# 因此同一種語言的使用者可以共用同一個已建立好的訊息物件，省去每次重建大量 Flex 元件的成本。
+_language_selection_flex_cache: Dict[str, FlexMessage] = {}
+
+# 語言選擇介面每行顯示的按鈕數量。
+LANGUAGE_BUTTONS_PER_ROW = 2
+# 語言按鈕不足一行時用來佔位的空白 FlexBox，內容固定，所有訊息共用同一個實例。
+_EMPTY_FLEX_BOX = FlexBox(layout="vertical", flex=1, contents=[])
+# 由所有語言按鈕組成的主體區塊快取，與使用者語言無關，第一次建立後即重複使用。
+_language_selection_body: Optional[FlexBox] = None
+
+# 訂單詳情訊息的格式範本，以單次 `.format()` 產生整段文字，取代逐行組合 f-string 再 join。
+_ORDER_DETAILS_HEADER_FMT = (
+    "<{title}>\n"
+    "--------------------\n"
+    "{store_label}: {store_name}\n"
+    "{time_label}: {time}\n"
+    "{total_label}: ${total}"
+)
+_ORDER_DETAILS_ITEM_FMT = "- {name} x {quantity}  (${subtotal})"
+
+# 合作等級（0、1、2）對應的範本 key，依序排列。
+PARTNER_LEVEL_TEMPLATE_KEYS = ("partner_level_0", "partner_level_1", "partner_level_2")
+# 輪播卡片內文的長度上限（LINE API 限制）。合作等級文字建立映射時即截斷，卡片迴圈中不需再處理。
+CAROUSEL_TEXT_MAX_LENGTH = 60
+# 預設語言（繁體中文）的合作等級文字映射。
+_DEFAULT_PARTNER_LEVEL_MAP: Dict[int, str] = {
+    level: REPLY_TEMPLATES[key][:CAROUSEL_TEXT_MAX_LENGTH]
+    for level, key in enumerate(PARTNER_LEVEL_TEMPLATE_KEYS)
+}
+# 各目標語言的合作等級文字映射快取，Key 為目標翻譯語言代碼。
+_partner_level_maps: Dict[str, Dict[int, str]] = {}
+
+# 「分享我的位置」快速回覆按鈕，內容固定，在模組載入時建立一次後所有訊息共用。
+_SHARE_LOCATION_QUICK_REPLY = QuickReply(
+    items=[
+        # 快速回覆項目只有一個按鈕。
+        QuickReplyItem(
+            # 這個按鈕的動作是 `LocationAction`，功能與模板訊息中的同類按鈕相同。
+            action=LocationAction(label="分享我的位置")
+        )
+    ]
+)
+
+# 主選單訊息的快取，Key 為主選單所用翻譯文字組成的 tuple，每種語言只會建立一次。
+_main_menu_cache: Dict[Tuple[str, ...], Tuple[TextMessage, TemplateMessage]] = {}
+
+# 由 `lang_code_map` 攤平而成的 `LINE 語言代碼 -> Google Translate 語言代碼` 映射，以及其來源映射表。
+_line_to_google_lang: Dict[str, str] = {}
+_line_to_google_lang_source: Optional[Dict[str, Any]] = None
+
+# 無動態變數範本的 `TextMessage` 快取，Key 為訊息文字（已翻譯），數量上限為範本數 × 語言數。
+_static_text_messages: Dict[str, TextMessage] = {}
+
+# 範本翻譯結果的行程內快取，Key 為 (template_key, 目標翻譯語言代碼)，Value 為尚未格式化的譯文。
+# `REPLY_TEMPLATES` 是固定內容，同一組 key 的翻譯結果不會改變，因此只需在第一次未命中時呼叫翻譯 API。
+_template_cache: Dict[Tuple[str, str], str] = {}
+
+# 動態文字（店家名稱、品項名稱等）翻譯結果的 LRU 快取，Key 為 (原文, 目標翻譯語言代碼)。
+# 同一家店或同一個品項常在不同使用者間重複出現，快取後可省去重複的翻譯請求。
+DYNAMIC_TEXT_CACHE_SIZE = 4096
+_dynamic_text_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+# 進行中的翻譯請求，Key 為 (待翻譯文字的 tuple, 目標翻譯語言代碼)，Value 為共用的 asyncio 任務。
+_inflight_translations: Dict[Tuple[Tuple[str, ...], str], "asyncio.Future[List[str]]"] = {}
+
+
+def _to_google_lang(line_lang_code: str, lang_code_map: Dict[str, Any]) -> str:
+    """
+    將 LINE 語言代碼轉換為 Google Translate 語言代碼。
+    第一次呼叫時將 `lang_code_map` 攤平成 `LINE 語言代碼 -> Google 語言代碼` 的單層字典並快取，
+    之後每次轉換只需一次字典查詢。若映射表中沒有對應項目，則直接使用 LINE 語言代碼。
+    """
+    global _line_to_google_lang, _line_to_google_lang_source
+    # `lang_code_map` 在啟動時由背景預熱任務就地填入，之後不再改變；
+    # 只有在傳入不同的映射表或其項目數量變動（例如預熱完成前曾被呼叫）時才重新攤平。
+    if (
+        lang_code_map is not _line_to_google_lang_source
+        or len(lang_code_map) != len(_line_to_google_lang)
+    ):
+        _line_to_google_lang = {
+            code: (mapping.get("translation") or code)
+            for code, mapping in lang_code_map.items()
+        }
+        _line_to_google_lang_source = lang_code_map
+    return _line_to_google_lang.get(line_lang_code, line_lang_code)
+
+
+async def _translate(
+    translate_client, texts: List[str], target_lang: str
+) -> List[str]:
+    """
+    將一組繁體中文文字翻譯成目標語言，翻譯失敗時直接拋出例外，由呼叫端決定如何降級。
+
+    相同內容與目標語言的請求若已在進行中，後到的呼叫者會等待同一個任務的結果，
+    避免快取尚未建立時大量使用者同時觸發重複的翻譯請求。
+    """
+    inflight_key = (tuple(texts), target_lang)
+    task = _inflight_translations.get(inflight_key)
+    if task is None:
+        task = asyncio.ensure_future(_call_translate_api(translate_client, texts, target_lang))
+        _inflight_translations[inflight_key] = task
+        # 任務完成（不論成功或失敗）後即從進行中清單移除，之後的請求改由快取處理或重新送出。
+        task.add_done_callback(lambda _: _inflight_translations.pop(inflight_key, None))
+    # 使用 `asyncio.shield`，避免其中一個等待者被取消時連帶取消其他人共用的任務。
+    return list(await asyncio.shield(task))
+
+
+async def _call_translate_api(
+    translate_client, texts: List[str], target_lang: str
+) -> List[str]:
+    """
+    實際呼叫翻譯 API。
+
+    若客戶端為 Translation API v3 的 `TranslationServiceAsyncClient`，則直接在事件循環上以非同步方式呼叫；
+    否則視為 v2 的同步 `translate_v2.Client`，使用 `asyncio.to_thread` 放到背景執行緒執行，避免阻塞事件循環。
+    """
+    if isinstance(translate_client, translate_v3.TranslationServiceAsyncClient):
+        response = await translate_client.translate_text(
+            request={
+                "parent": Config.TRANSLATE_PARENT,
+                "contents": texts,
+                "mime_type": "text/plain",
+                "source_language_code": "zh-TW",
+                "target_language_code": target_lang,
+            }
+        )
+        return [translation.translated_text for translation in response.translations]
+
+    results = await asyncio.to_thread(
+        translate_client.translate,
+        texts,
+        target_language=target_lang,
+        source_language="zh-TW",
+    )
+    return [result["translatedText"] for result in results]
 
 
 async def translate_texts_batch(
@@ -90,25 +262,22 @@ async def translate_texts_batch(
         return texts
 
     # 從語言映射表中找到 LINE 語言代碼對應的 Google Translate 語言代碼。
-    lang_map = lang_code_map.get(user.preferred_lang)
-    target_lang = lang_map.get("translation") if lang_map else user.preferred_lang
+    target_lang = _to_google_lang(user.preferred_lang, lang_code_map)
 
     # 如果目標語言是 "zh-TW" (Google Translate 的繁中代碼) 或沒有任何文字需要翻譯，則直接返回。
     if target_lang == "zh-TW" or not texts:
         return texts
 
+    # 去除重複的文字（保留原始順序），例如歷史訂單中重複出現的店家名稱，只需翻譯一次。
+    unique_texts = list(dict.fromkeys(texts))
+
     # 使用 try...except 處理可能的翻譯 API 錯誤。
     try:
-        # `translate_client.translate` 是同步函式庫，使用 `asyncio.to_thread` 將其放入獨立的執行緒中執行，
-        # 避免阻塞 asyncio 的事件循環 (event loop)。
-        results = await asyncio.to_thread(
-            translate_client.translate,
-            texts, # 要翻譯的文字列表
-            target_language=target_lang, # 目標語言
-            source_language="zh-TW", # 來源語言
-        )
-        # 從翻譯結果中提取翻譯後的文字，並組合成一個新的列表返回。
-        return [result["translatedText"] for result in results]
+        # 透過 `_translate` 呼叫翻譯 API，它會依客戶端類型選擇原生非同步或執行緒的呼叫方式。
+        translated_unique = await _translate(translate_client, unique_texts, target_lang)
+        # 將去重後的翻譯結果依原始順序展開回完整列表。
+        translation_map = dict(zip(unique_texts, translated_unique))
+        return [translation_map[text] for text in texts]
     except Exception as e:
         # 如果翻譯失敗，記錄錯誤並返回原始文字，確保程式不會因此中斷。
         logger.error(
@@ -117,6 +286,224 @@ async def translate_texts_batch(
         return texts
 
 
+async def translate_dynamic_texts(
+    texts: List[str], user: User, translate_client, lang_code_map: Dict[str, Any]
+) -> List[str]:
+    """
+    翻譯一組動態文字（如店家名稱、品項名稱），並以 LRU 快取保存結果。
+    只有快取未命中的文字（去除重複後）才會送出批次翻譯請求。
+    """
+    if not translate_client or not texts:
+        return texts
+    if not user or not user.preferred_lang or user.preferred_lang == "zh-Hant":
+        return texts
+
+    target_lang = _to_google_lang(user.preferred_lang, lang_code_map)
+    if target_lang == "zh-TW":
+        return texts
+
+    translated_map: Dict[str, str] = {}
+    missing = []
+    for text in dict.fromkeys(texts):
+        cached = _dynamic_text_cache.get((text, target_lang))
+        if cached is None:
+            missing.append(text)
+        else:
+            # 命中時移到最後，標記為最近使用。
+            _dynamic_text_cache.move_to_end((text, target_lang))
+            translated_map[text] = cached
+
+    if missing:
+        missing_translated = await translate_texts_batch(
+            missing, user, translate_client, lang_code_map
+        )
+        for text, translated in zip(missing, missing_translated):
+            translated_map[text] = translated
+            # 翻譯失敗時 `translate_texts_batch` 會返回原文，此時不寫入快取。
+            if translated != text:
+                _dynamic_text_cache[(text, target_lang)] = translated
+        # 超過容量時淘汰最久未使用的項目。
+        while len(_dynamic_text_cache) > DYNAMIC_TEXT_CACHE_SIZE:
+            _dynamic_text_cache.popitem(last=False)
+
+    return [translated_map[text] for text in texts]
+
+
+async def _translate_template(
+    template_key: str, default_text: str, target_lang: str, translate_client
+) -> str:
+    """
+    翻譯單一範本文字（尚未格式化），並將結果快取於 `_template_cache`。
+    翻譯失敗時返回原文，且不寫入快取，以便下次重試。
+    """
+    cache_key = (template_key, target_lang)
+    # 命中快取時直接返回，不再呼叫翻譯 API。
+    cached = _template_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # 處理可能的 API 錯誤。
+    try:
+        translated = (await _translate(translate_client, [default_text], target_lang))[0]
+    except Exception as e:
+        # 如果翻譯失敗，記錄錯誤並返回預設語言的文字。
+        logger.error(
+            f"Translation to {target_lang} for key '{template_key}' failed: {e}"
+        )
+        return default_text
+
+    # 只快取存在於 `REPLY_TEMPLATES` 中的 key，避免錯誤的 key 佔用快取。
+    if template_key in REPLY_TEMPLATES:
+        _template_cache[cache_key] = translated
+    return translated
+
+
+async def translate_templates_batch(
+    template_keys: List[str], user: User, translate_client, lang_code_map: Dict[str, Any]
+) -> List[str]:
+    """
+    依使用者語言取得多個範本的翻譯（尚未格式化）。
+    優先查詢 `_template_cache`，只有未命中的範本才會合併成一次批次翻譯請求。
+    """
+    default_texts = [REPLY_TEMPLATES[key] for key in template_keys]
+
+    if not translate_client:
+        return default_texts
+    if not user or not user.preferred_lang or user.preferred_lang == "zh-Hant":
+        return default_texts
+
+    target_lang = _to_google_lang(user.preferred_lang, lang_code_map)
+    if target_lang == "zh-TW":
+        return default_texts
+
+    translated = [_template_cache.get((key, target_lang)) for key in template_keys]
+    missing = [i for i, text in enumerate(translated) if text is None]
+    if missing:
+        missing_translated = await translate_texts_batch(
+            [default_texts[i] for i in missing], user, translate_client, lang_code_map
+        )
+        for i, text in zip(missing, missing_translated):
+            translated[i] = text
+            # 翻譯失敗時 `translate_texts_batch` 會返回原文，此時不寫入快取。
+            if text != default_texts[i]:
+                _template_cache[(template_keys[i], target_lang)] = text
+    return translated
+
+
+async def preload_template_translations(
+    translate_client, lang_code_map: Dict[str, Any], line_lang_codes: List[str]
+) -> int:
+    """
+    在應用程式啟動時，將所有 `REPLY_TEMPLATES` 預先翻譯成每一種支援的語言並寫入 `_template_cache`。
+    每種目標語言只送出一次批次翻譯請求，並以 `asyncio.gather` 同時執行。
+    已有完整快取（例如從磁碟快取載入）的語言會被略過。返回本次新翻譯並快取的語言數量。
+    """
+    if not translate_client:
+        return 0
+
+    # 將 LINE 語言代碼轉換為 Google Translate 語言代碼，並去除重複與預設語言。
+    target_langs = []
+    for line_lang_code in line_lang_codes:
+        if line_lang_code == "zh-Hant":
+            continue
+        target_lang = _to_google_lang(line_lang_code, lang_code_map)
+        if target_lang and target_lang != "zh-TW" and target_lang not in target_langs:
+            target_langs.append(target_lang)
+
+    template_keys = list(REPLY_TEMPLATES.keys())
+    default_texts = list(REPLY_TEMPLATES.values())
+
+    # 已從磁碟快取載入完整翻譯的語言不需要再呼叫翻譯 API。
+    target_langs = [
+        lang
+        for lang in target_langs
+        if not all((key, lang) in _template_cache for key in template_keys)
+    ]
+    if not target_langs:
+        return 0
+
+    async def _translate_all(target_lang: str) -> bool:
+        try:
+            results = await _translate(translate_client, default_texts, target_lang)
+        except Exception as e:
+            logger.error(f"Pre-translating reply templates to {target_lang} failed: {e}")
+            return False
+        for key, translated in zip(template_keys, results):
+            _template_cache[(key, target_lang)] = translated
+        return True
+
+    results = await asyncio.gather(*[_translate_all(lang) for lang in target_langs])
+    return sum(results)
+
+
+def _templates_fingerprint() -> str:
+    """
+    計算目前 `REPLY_TEMPLATES` 內容的雜湊值，用於判斷磁碟快取是否仍對應相同的範本。
+    """
+    payload = orjson.dumps(dict(REPLY_TEMPLATES), option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def load_template_cache_file(path: str) -> int:
+    """
+    從磁碟載入先前儲存的範本翻譯結果並寫入 `_template_cache`。
+    只有在檔案中的範本雜湊值與目前 `REPLY_TEMPLATES` 相符時才會採用。
+    這是同步函式，呼叫端應使用 `asyncio.to_thread` 執行。返回載入的語言數量。
+    """
+    try:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.warning(f"Failed to load template translation cache from {path}: {e}")
+        return 0
+
+    if not isinstance(data, dict):
+        logger.warning(f"Template translation cache at {path} has an unexpected format. Ignoring it.")
+        return 0
+
+    if data.get("fingerprint") != _templates_fingerprint():
+        logger.info("Template translation cache is stale. Ignoring it.")
+        return 0
+
+    translations = data.get("translations", {})
+    if not isinstance(translations, dict) or not all(
+        isinstance(texts, dict) for texts in translations.values()
+    ):
+        logger.warning(f"Template translation cache at {path} has an unexpected format. Ignoring it.")
+        return 0
+
+    for target_lang, texts in translations.items():
+        for key, translated in texts.items():
+            if key in REPLY_TEMPLATES:
+                _template_cache[(key, target_lang)] = translated
+    return len(translations)
+
+
+def save_template_cache_file(path: str) -> None:
+    """
+    將 `_template_cache` 中的範本翻譯結果連同範本雜湊值寫入磁碟，供下次啟動時載入。
+    先寫入暫存檔再以 `os.replace` 取代，避免寫入中途失敗留下損毀的檔案。
+    這是同步函式，呼叫端應使用 `asyncio.to_thread` 執行。
+    """
+    translations: Dict[str, Dict[str, str]] = {}
+    for (key, target_lang), translated in _template_cache.items():
+        translations.setdefault(target_lang, {})[key] = translated
+
+    payload = orjson.dumps(
+        {"fingerprint": _templates_fingerprint(), "translations": translations}
+    )
+    tmp_path = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Failed to save template translation cache to {path}: {e}")
+
+
 async def get_translated_text(
     user: User,
     template_key: str,
@@ -142,30 +529,17 @@ async def get_translated_text(
         return default_text.format(**kwargs)
 
     # 找出目標翻譯語言代碼。
-    lang_map = lang_code_map.get(user.preferred_lang)
-    target_lang = lang_map.get("translation") if lang_map else user.preferred_lang
+    target_lang = _to_google_lang(user.preferred_lang, lang_code_map)
 
     # 如果目標語言是繁體中文，直接返回。
     if target_lang == "zh-TW":
         return default_text.format(**kwargs)
 
-    # 處理可能的 API 錯誤。
-    try:
-        # 使用 `asyncio.to_thread` 執行同步的翻譯請求。
-        result = await asyncio.to_thread(
-            translate_client.translate,
-            default_text,
-            target_language=target_lang,
-            source_language="zh-TW",
-        )
-        # 返回翻譯後並格式化過的文字。
-        return result["translatedText"].format(**kwargs)
-    except Exception as e:
-        # 如果翻譯失敗，記錄錯誤並返回預設語言的文字。
-        logger.error(
-            f"Translation to {target_lang} for key '{template_key}' failed: {e}"
-        )
-        return default_text.format(**kwargs)
+    translated = await _translate_template(
+        template_key, default_text, target_lang, translate_client
+    )
+    # 返回翻譯後並格式化過的文字。
+    return translated.format(**kwargs)
 
 
 async def get_translated_text_for_target_lang(
@@ -187,85 +561,47 @@ async def get_translated_text_for_target_lang(
         return default_text.format(**kwargs)
 
     # 找出目標翻譯語言代碼。
-    lang_map = lang_code_map.get(target_line_lang_code)
-    target_translation_lang = (
-        lang_map.get("translation") if lang_map else target_line_lang_code
-    )
+    target_translation_lang = _to_google_lang(target_line_lang_code, lang_code_map)
 
     # 如果目標翻譯語言是繁體中文，直接返回。
     if target_translation_lang == "zh-TW":
         return default_text.format(**kwargs)
 
-    # 處理 API 錯誤。
-    try:
-        # 執行翻譯。
-        result = await asyncio.to_thread(
-            translate_client.translate,
-            default_text,
-            target_language=target_translation_lang,
-            source_language="zh-TW",
-        )
-        # 返回翻譯後並格式化過的文字。
-        return result["translatedText"].format(**kwargs)
-    except Exception as e:
-        logger.error(
-            f"Translation to {target_translation_lang} for key '{template_key}' failed: {e}"
-        )
-        return default_text.format(**kwargs)
+    translated = await _translate_template(
+        template_key, default_text, target_translation_lang, translate_client
+    )
+    # 返回翻譯後並格式化過的文字。
+    return translated.format(**kwargs)
 
 
-async def localize_lang_name(
-    canonical_name: str, target_lang: str, translate_client
-) -> str:
+def _get_set_language_postback(lang_code: str) -> str:
     """
-    將一個標準的語言名稱（如 "繁體中文"）翻譯成目標語言本身（如翻譯成英文變成 "Traditional Chinese"）。
+    取得「設定語言」按鈕的 postback 資料字串，同一個語言代碼只會序列化一次。
     """
-    # 如果目標語言不是預設語言，才進行翻譯。
-    if target_lang != "zh-Hant":
-        try:
-            # 執行翻譯。
-            result = await asyncio.to_thread(
-                translate_client.translate,
-                canonical_name,
-                target_language=target_lang,
-                source_language="zh-TW",
-            )
-            return result["translatedText"]
-        except Exception as e:
-            # 翻譯失敗則記錄錯誤並返回原文。
-            logger.error(
-                f"Failed to localize lang_name '{canonical_name}' to {target_lang}: {e}"
-            )
-    # 如果是預設語言或翻譯失敗，返回原文。
-    return canonical_name
+    postback = _set_language_postbacks.get(lang_code)
+    if postback is None:
+        postback = _dumps({"action": ActionType.SET_LANGUAGE, "lang_code": lang_code})
+        _set_language_postbacks[lang_code] = postback
+    return postback
 
 
-async def create_language_selection_flex_message(
-    user: User,
-    translate_client,
-    lang_code_map: Dict[str, Any],
-    native_language_list: List[Dict[str, Any]],
-    display_texts_cache: Dict[str, str],
-) -> FlexMessage:
+def _get_language_selection_body(
+    native_language_list: List[Dict[str, Any]], display_texts_cache: Dict[str, str]
+) -> FlexBox:
     """
-    建立一個讓使用者選擇語言的 Flex Message。
-    Flex Message 是一種可以高度自訂排版的訊息格式。
+    建立語言選擇 Flex Message 的主體區塊（所有語言按鈕）。
+    語言列表與顯示文字在啟動後不再改變，因此建立一次後即快取，供所有提示文字共用。
     """
-    # 取得翻譯後的提示文字。
-    prompt_text = await get_translated_text(
-        user,
-        "flex_language_prompt",
-        translate_client=translate_client,
-        lang_code_map=lang_code_map,
-    )
+    global _language_selection_body
+    if _language_selection_body is not None:
+        return _language_selection_body
 
     # `body_contents` 用於存放所有語言按鈕的排版元件。
     body_contents = []
-    buttons_per_row = 2 # 設定每行顯示兩個語言按鈕。
     # 將語言列表切割成多個子列表，每個子列表代表一行。
     language_chunks = [
-        native_language_list[i : i + buttons_per_row]
-        for i in range(0, len(native_language_list), buttons_per_row)
+        native_language_list[i : i + LANGUAGE_BUTTONS_PER_ROW]
+        for i in range(0, len(native_language_list), LANGUAGE_BUTTONS_PER_ROW)
     ]
 
     # 遍歷每一行的語言資料。
@@ -287,15 +623,14 @@ async def create_language_selection_flex_message(
                 text=lang_name, wrap=True, align="center", size="sm", color="#007BFF"
             )
 
-            # 準備 PostbackAction 的資料，當使用者點擊按鈕時，LINE 平台會將這些資料傳回我們的 webhook。
-            postback_data = {"action": ActionType.SET_LANGUAGE, "lang_code": lang_code}
             # 建立一個 FlexBox 作為按鈕的容器。
             custom_button = FlexBox(
                 layout="vertical",
                 # `action` 決定了這個元件的可點擊行為。
                 action=PostbackAction(
                     label=lang_name, # 按鈕標籤（在無法顯示 Flex Message 的裝置上作為替代文字）
-                    data=json.dumps(postback_data), # 傳回的資料，必須是字串
+                    # 傳回的資料，必須是字串。當使用者點擊按鈕時，LINE 平台會將這些資料傳回我們的 webhook。
+                    data=_get_set_language_postback(lang_code),
                     displayText=display_text, # 使用者點擊後，在聊天室中顯示的文字
                 ),
                 flex=1, # 佔滿可用空間
@@ -304,9 +639,9 @@ async def create_language_selection_flex_message(
             )
             row_components.append(custom_button)
 
-        # 如果一行不滿 `buttons_per_row` 個按鈕，用空的 FlexBox 佔位，以維持排版整齊。
-        while len(row_components) < buttons_per_row:
-            row_components.append(FlexBox(layout="vertical", flex=1, contents=[]))
+        # 如果一行不滿 `LANGUAGE_BUTTONS_PER_ROW` 個按鈕，用共用的空白 FlexBox 佔位，以維持排版整齊。
+        while len(row_components) < LANGUAGE_BUTTONS_PER_ROW:
+            row_components.append(_EMPTY_FLEX_BOX)
 
         # 將單行的所有按鈕元件放入一個水平排列的 FlexBox 中。
         row_box = FlexBox(
@@ -314,6 +649,40 @@ async def create_language_selection_flex_message(
         )
         body_contents.append(row_box)
 
+    body_box = FlexBox(layout="vertical", contents=body_contents, spacing="sm")
+    # 只在語言列表已成功載入時才快取。
+    if native_language_list:
+        _language_selection_body = body_box
+    return body_box
+
+
+async def create_language_selection_flex_message(
+    user: User,
+    translate_client,
+    lang_code_map: Dict[str, Any],
+    native_language_list: List[Dict[str, Any]],
+    display_texts_cache: Dict[str, str],
+) -> FlexMessage:
+    """
+    建立一個讓使用者選擇語言的 Flex Message。
+    Flex Message 是一種可以高度自訂排版的訊息格式。
+    """
+    # 取得翻譯後的提示文字。
+    prompt_text = await get_translated_text(
+        user,
+        "flex_language_prompt",
+        translate_client=translate_client,
+        lang_code_map=lang_code_map,
+    )
+
+    # 已經為同樣的提示文字建立過訊息時，直接重用。
+    cached_message = _language_selection_flex_cache.get(prompt_text)
+    if cached_message is not None:
+        return cached_message
+
+    # 取得所有語言按鈕組成的主體區塊，這部分與使用者無關，只會建立一次。
+    body_box = _get_language_selection_body(native_language_list, display_texts_cache)
+
     # 建立 Flex Message 的主要結構，稱為 "bubble"。
     bubble = FlexBubble(
         size="kilo", # 泡泡的大小
@@ -324,12 +693,44 @@ async def create_language_selection_flex_message(
             contents=[FlexText(text=prompt_text, weight="regular", size="md", wrap=True)],
         ),
         # 泡泡的主體區塊 (body)，包含所有語言按鈕。
-        body=FlexBox(layout="vertical", contents=body_contents, spacing="sm"),
+        body=body_box,
     )
 
     # 最後，將 bubble 包裝成一個 `FlexMessage` 物件並返回。
     # `alt_text` 是在聊天列表或推播通知中顯示的替代文字。
-    return FlexMessage(alt_text=prompt_text, contents=bubble)
+    flex_message = FlexMessage(alt_text=prompt_text, contents=bubble)
+    # 只在語言列表已成功載入時才快取，避免啟動時載入失敗的空白選單被永久保留。
+    if native_language_list:
+        _language_selection_flex_cache[prompt_text] = flex_message
+    return flex_message
+
+
+# `urllib.parse.quote` 以 Python 迴圈逐字元處理，對重複出現的店名快取編碼結果。
+_quote_cached = lru_cache(maxsize=4096)(quote)
+# LIFF URL 中不隨店家或使用者變動的前綴。
+_LIFF_URL_PREFIX = f"line://app/{Config.LIFF_ID}?store_id="
+# 店家卡片圖片 URL 的網域前綴，在模組載入時去除結尾的斜線一次。
+_PHOTO_BASE_URL = Config.BASE_URL.rstrip("/") if Config.BASE_URL else None
+# 店家沒有照片時使用的預設圖片。
+_PLACEHOLDER_PHOTO_URL = "https://via.placeholder.com/1024x1024.png?text=No+Image"
+
+
+@lru_cache(maxsize=4096)
+def _card_photo_url(main_photo_url: Optional[str]) -> str:
+    """
+    取得店家卡片要顯示的圖片 URL。同一家店的照片路徑固定，以快取省去重複組合字串。
+    """
+    # 如果店家資料中沒有主照片 URL，使用預設圖片。
+    if not main_photo_url:
+        return _PLACEHOLDER_PHOTO_URL
+    # 如果 URL 已經是絕對路徑，則直接使用。
+    if not main_photo_url.startswith("/"):
+        return main_photo_url
+    # 如果 URL 是相對路徑 (以 "/" 開頭) 且設定檔中有設定 `BASE_URL`，則組合成完整的絕對路徑 URL。
+    if _PHOTO_BASE_URL:
+        return f"{_PHOTO_BASE_URL}{main_photo_url}"
+    logger.warning("BASE_URL is not set... Carousel will use a placeholder image.")
+    return _PLACEHOLDER_PHOTO_URL
 
 
 def create_liff_url(user: User, store: Store, translated_store_name: str) -> str:
@@ -337,14 +738,14 @@ def create_liff_url(user: User, store: Store, translated_store_name: str) -> str
     建立並返回一個 LIFF (LINE Front-end Framework) 應用程式的 URL。
     LIFF URL 允許在 LINE 內部開啟一個網頁視窗。
     """
-    # 對傳入的翻譯後店名進行 URL 編碼。
-    encoded_store_name = quote(translated_store_name)
+    # 對傳入的翻譯後店名進行 URL 編碼。同一家店的名稱會在不同卡片與使用者間重複出現，因此使用快取版本。
+    encoded_store_name = _quote_cached(translated_store_name)
     # 判斷店家是否為合作夥伴。
     is_partner = "true" if store.partner_level > 0 else "false"
     # 取得使用者的偏好語言。
     user_lang = user.preferred_lang if user else "en"
-    # 組合 LIFF URL...
-    return f"line://app/{Config.LIFF_ID}?store_id={store.store_id}&store_name={encoded_store_name}&is_partner={is_partner}&lang={user_lang}"
+    # 以預先組合好的固定前綴組合 LIFF URL...
+    return f"{_LIFF_URL_PREFIX}{store.store_id}&store_name={encoded_store_name}&is_partner={is_partner}&lang={user_lang}"
 
 
 async def create_main_menu_messages(
@@ -361,14 +762,17 @@ async def create_main_menu_messages(
         "button_label_order_history",
         "button_label_change_language",
     ]
-    # 取得這些 key 對應的預設文字。
-    default_texts = [REPLY_TEMPLATES[key] for key in template_keys]
-
-    # 使用批次翻譯函式一次性翻譯所有文字。
-    translated_texts = await translate_texts_batch(
-        default_texts, user, translate_client, lang_code_map
+    # 取得這些範本的翻譯，已預先快取的範本不會再呼叫翻譯 API。
+    translated_texts = await translate_templates_batch(
+        template_keys, user, translate_client, lang_code_map
     )
 
+    # 主選單內容只取決於這組翻譯文字，已建立過相同內容的訊息時直接重用，省去 LINE SDK 模型的重新驗證。
+    cache_key = tuple(translated_texts)
+    cached_messages = _main_menu_cache.get(cache_key)
+    if cached_messages is not None:
+        return list(cached_messages)
+
     # 將翻譯後的文字解包到各個變數中。
     welcome_text, prompt_text, order_now_label, history_label, change_lang_label = (
         translated_texts
@@ -384,17 +788,18 @@ async def create_main_menu_messages(
             LocationAction(label=order_now_label),
             # 按鈕2: "歷史訂單"。這是一個 `PostbackAction`，點擊後會觸發一個 postback 事件。
             PostbackAction(
-                label=history_label, data=json.dumps({"action": ActionType.ORDER_HISTORY})
+                label=history_label, data=ORDER_HISTORY_POSTBACK
             ),
             # 按鈕3: "更改語言"。
             PostbackAction(
                 label=change_lang_label,
-                data=json.dumps({"action": ActionType.CHANGE_LANGUAGE}),
+                data=CHANGE_LANGUAGE_POSTBACK,
             ),
         ],
     )
     # 將按鈕模板包裝成一個 `TemplateMessage` 物件。
     template_message = TemplateMessage(alt_text=prompt_text, template=buttons_template)
+    _main_menu_cache[cache_key] = (text_message, template_message)
     # 返回包含這兩則訊息的列表。LINE 會依序傳送它們。
     return [text_message, template_message]
 
@@ -416,16 +821,53 @@ async def create_ask_location_message(
     return TextMessage(
         text=ask_location_text,
         # 附加 `QuickReply` (快速回覆)。快速回覆按鈕會顯示在輸入框上方。
-        quick_reply=QuickReply(
-            items=[
-                # 快速回覆項目只有一個按鈕。
-                QuickReplyItem(
-                    # 這個按鈕的動作是 `LocationAction`，功能與模板訊息中的同類按鈕相同。
-                    action=LocationAction(label="分享我的位置")
-                )
-            ]
-        ),
+        # 其內容固定，直接使用模組層級共用的實例。
+        quick_reply=_SHARE_LOCATION_QUICK_REPLY,
+    )
+
+
+def _resolve_target_lang(
+    user: User, translate_client, lang_code_map: Dict[str, Any]
+) -> Optional[str]:
+    """
+    取得使用者對應的 Google Translate 目標語言代碼。
+    若不需要翻譯（翻譯客戶端不可用、使用者為預設語言或目標語言為繁體中文），返回 None。
+    """
+    if not translate_client:
+        return None
+    if not user or not user.preferred_lang or user.preferred_lang == "zh-Hant":
+        return None
+    target_lang = _to_google_lang(user.preferred_lang, lang_code_map)
+    if target_lang == "zh-TW":
+        return None
+    return target_lang
+
+
+async def _get_partner_level_map(
+    user: User, translate_client, lang_code_map: Dict[str, Any]
+) -> Dict[int, str]:
+    """
+    取得使用者語言的合作等級文字映射字典（合作等級 -> 顯示文字），並依目標語言快取。
+    顯示文字已截斷至輪播卡片內文的長度上限。
+    """
+    target_lang = _resolve_target_lang(user, translate_client, lang_code_map)
+    if target_lang is None:
+        return _DEFAULT_PARTNER_LEVEL_MAP
+
+    cached = _partner_level_maps.get(target_lang)
+    if cached is not None:
+        return cached
+
+    labels = await translate_templates_batch(
+        list(PARTNER_LEVEL_TEMPLATE_KEYS), user, translate_client, lang_code_map
     )
+    partner_level_map = {
+        level: label[:CAROUSEL_TEXT_MAX_LENGTH] for level, label in enumerate(labels)
+    }
+    # 只有三個標籤都已成功翻譯（已寫入範本快取）時才快取，翻譯失敗的原文結果留待下次重試。
+    if all((key, target_lang) in _template_cache for key in PARTNER_LEVEL_TEMPLATE_KEYS):
+        _partner_level_maps[target_lang] = partner_level_map
+    return partner_level_map
 
 
 async def create_store_carousel_message(
@@ -437,18 +879,8 @@ async def create_store_carousel_message(
     """
     # --- 批次翻譯 ---
     # 為了最佳化，將所有需要翻譯的文字一次收集起來。
-    
-    # 1. 靜態文字：不論有幾個店家，這些文字都是固定的。
-    static_template_keys = [
-        "start_ordering",
-        "view_store_summary",
-        "partner_level_0",
-        "partner_level_1",
-        "partner_level_2",
-    ]
-    static_default_texts = [REPLY_TEMPLATES[key] for key in static_template_keys]
 
-    # 2. 動態文字：每個店家都有自己的名稱和點擊按鈕時的顯示文字。
+    # 1. 動態文字：每個店家都有自己的名稱和點擊按鈕時的顯示文字，只有未快取的部分會送去翻譯。
     dynamic_default_texts = []
     for store in stores:
         dynamic_default_texts.append(store.store_name)
@@ -456,22 +888,26 @@ async def create_store_carousel_message(
             REPLY_TEMPLATES["querying_store_summary"].format(store_name=store.store_name)
         )
 
-    # 將靜態和動態文字合併成一個大列表，並一次性送去翻譯。
-    all_default_texts = static_default_texts + dynamic_default_texts
-    all_translated_texts = await translate_texts_batch(
-        all_default_texts, user, translate_client, lang_code_map
-    )
-
-    # --- 處理翻譯結果 ---
-    num_static = len(static_default_texts)
-    translated_static = all_translated_texts[:num_static] # 分離出翻譯後的靜態文字
-    translated_dynamic = all_translated_texts[num_static:] # 分離出翻譯後的動態文字
-
-    start_ordering_label, view_summary_label, partner_level_0, partner_level_1, partner_level_2 = (
-        translated_static
+    # 2. 使用 `asyncio.gather` 同時取得彼此獨立的翻譯結果，讓網路等待時間重疊：
+    #    a. 靜態文字（按鈕標籤與替代文字），直接取自範本翻譯快取。
+    #    b. 合作等級文字的映射字典，每種語言只建立一次。
+    #    c. 動態文字。
+    static_texts, partner_level_map, translated_dynamic = await asyncio.gather(
+        translate_templates_batch(
+            ["start_ordering", "view_store_summary", "alt_text_store_list"],
+            user,
+            translate_client,
+            lang_code_map,
+        ),
+        _get_partner_level_map(user, translate_client, lang_code_map),
+        translate_dynamic_texts(
+            dynamic_default_texts, user, translate_client, lang_code_map
+        ),
     )
-    # 建立一個合作等級文字的映射字典，方便後續使用。
-    partner_level_map = {0: partner_level_0, 1: partner_level_1, 2: partner_level_2}
+    start_ordering_label, view_summary_label, alt_text = static_texts
+    # 按鈕標籤有長度限制（LINE API 限制 20 字元），所有卡片共用，在迴圈外截斷一次即可。
+    start_ordering_label = start_ordering_label[:20]
+    view_summary_label = view_summary_label[:20]
 
     # --- 建立輪播卡片 ---
     carousel_columns = []
@@ -483,26 +919,11 @@ async def create_store_carousel_message(
 
         # 產生點餐用的 LIFF URL。
         liff_full_url = create_liff_url(user, store, translated_store_name)
-        # 設定卡片的預設圖片。
-        card_photo_url = "https://via.placeholder.com/1024x1024.png?text=No+Image"
-        # 如果店家資料中有主照片 URL...
-        if store.main_photo_url:
-            # 如果 URL 是相對路徑 (以 "/" 開頭)...
-            if store.main_photo_url.startswith("/"):
-                # 且設定檔中有設定 `BASE_URL`...
-                if Config.BASE_URL:
-                    # 則組合成完整的絕對路徑 URL。
-                    card_photo_url = f"{Config.BASE_URL.rstrip('/')}{store.main_photo_url}"
-                else:
-                    logger.warning(
-                        "BASE_URL is not set... Carousel will use a placeholder image."
-                    )
-            else:
-                # 如果 URL 已經是絕對路徑，則直接使用。
-                card_photo_url = store.main_photo_url
+        # 取得卡片圖片的 URL（沒有照片時為預設圖片）。
+        card_photo_url = _card_photo_url(store.main_photo_url)
 
         # 根據店家的合作等級，取得對應的狀態文字。
-        status_text = partner_level_map.get(store.partner_level, partner_level_0)
+        status_text = partner_level_map.get(store.partner_level, partner_level_map[0])
 
         # 準備 "店家介紹" 按鈕的 postback 資料。
         summary_postback_data = {
@@ -513,27 +934,20 @@ async def create_store_carousel_message(
         column = CarouselColumn(
             thumbnail_image_url=card_photo_url, # 卡片頂部的圖片
             title=translated_store_name[:40], # 卡片標題（LINE API 有長度限制）
-            text=status_text[:60], # 卡片內文（LINE API 有長度限制）
+            text=status_text, # 卡片內文（已在合作等級映射中截斷至 LINE API 的長度限制）
             actions=[
                 # 按鈕1: "開始點餐"。`URIAction` 會開啟指定的 URL (此處為 LIFF URL)。
-                URIAction(label=start_ordering_label[:20], uri=liff_full_url),
+                URIAction(label=start_ordering_label, uri=liff_full_url),
                 # 按鈕2: "店家介紹"。`PostbackAction`。
                 PostbackAction(
-                    label=view_summary_label[:20],
-                    data=json.dumps(summary_postback_data),
+                    label=view_summary_label,
+                    data=_dumps(summary_postback_data),
                     displayText=translated_display_text,
                 ),
             ],
         )
         carousel_columns.append(column)
 
-    # 取得輪播訊息的替代文字。
-    alt_text = await get_translated_text(
-        user,
-        "alt_text_store_list",
-        translate_client=translate_client,
-        lang_code_map=lang_code_map,
-    )
     # 將所有卡片放入 `CarouselTemplate`，再包裝成 `TemplateMessage` 並返回。
     return TemplateMessage(
         alt_text=alt_text, template=CarouselTemplate(columns=carousel_columns)
@@ -549,11 +963,7 @@ async def create_order_history_carousel(
     carousel_columns = []
 
     # --- 批次翻譯 ---
-    # 1. 靜態文字：按鈕標籤。
-    template_keys_to_translate = ["view_order_details", "order_again"]
-    static_texts = [REPLY_TEMPLATES[key] for key in template_keys_to_translate]
-
-    # 過濾掉沒有關聯店家資料的異常訂單。
+    # 1. 過濾掉沒有關聯店家資料的異常訂單。
     valid_orders = [order for order in orders if order.store]
 
     # 2. 動態文字：每個訂單卡片的按鈕顯示文字。
@@ -567,23 +977,31 @@ async def create_order_history_carousel(
     # 3. 動態文字：每個訂單卡片的店家名稱。
     store_names_to_translate = [order.store.store_name for order in valid_orders]
 
-    # 合併並執行批次翻譯。
-    all_texts_to_translate = (
-        static_texts + display_texts_to_translate + store_names_to_translate
-    )
-    translated_texts = await translate_texts_batch(
-        all_texts_to_translate, user, translate_client, lang_code_map
+    # 4. 同時取得靜態文字（按鈕標籤與替代文字，取自範本翻譯快取）和動態文字的翻譯，
+    #    動態文字合併成一次批次翻譯，已快取的文字不會重複送出。
+    static_texts, translated_texts = await asyncio.gather(
+        translate_templates_batch(
+            ["view_order_details", "order_again", "alt_text_order_history"],
+            user,
+            translate_client,
+            lang_code_map,
+        ),
+        translate_dynamic_texts(
+            display_texts_to_translate + store_names_to_translate,
+            user,
+            translate_client,
+            lang_code_map,
+        ),
     )
+    view_details_label, order_again_label, alt_text = static_texts
+    # 按鈕標籤有長度限制（LINE API 限制 20 字元），所有卡片共用，在迴圈外截斷一次即可。
+    view_details_label = view_details_label[:20]
+    order_again_label = order_again_label[:20]
 
     # --- 處理翻譯結果 ---
-    num_static = len(static_texts)
     num_orders = len(valid_orders)
-
-    view_details_label = translated_texts[0]
-    order_again_label = translated_texts[1]
-
-    translated_display_texts = translated_texts[num_static : num_static + num_orders]
-    translated_store_names = translated_texts[num_static + num_orders :]
+    translated_display_texts = translated_texts[:num_orders]
+    translated_store_names = translated_texts[num_orders:]
 
     # --- 建立輪播卡片 ---
     for i, order in enumerate(valid_orders):
@@ -606,11 +1024,11 @@ async def create_order_history_carousel(
         # 定義卡片的兩個按鈕。
         actions = [
             PostbackAction(
-                label=view_details_label[:20],
-                data=json.dumps(details_postback_data),
+                label=view_details_label,
+                data=_dumps(details_postback_data),
                 displayText=translated_display_text,
             ),
-            URIAction(label=order_again_label[:20], uri=create_liff_url(user, store, translated_store_name)),
+            URIAction(label=order_again_label, uri=create_liff_url(user, store, translated_store_name)),
         ]
 
         # 建立輪播卡片。
@@ -619,13 +1037,6 @@ async def create_order_history_carousel(
         )
         carousel_columns.append(column)
 
-    # 取得輪播訊息的替代文字。
-    alt_text = await get_translated_text(
-        user,
-        "alt_text_order_history",
-        translate_client=translate_client,
-        lang_code_map=lang_code_map,
-    )
     # 將所有卡片組合成輪播模板訊息並返回。
     return TemplateMessage(
         alt_text=alt_text, template=CarouselTemplate(columns=carousel_columns)
@@ -650,8 +1061,7 @@ async def create_order_details_message(
             lang_code_map=lang_code_map,
         )
 
-    # --- 1. 合併所有待翻譯文字 ---
-    # a. 靜態標籤文字
+    # --- 1. 靜態標籤文字：直接取自範本翻譯快取 ---
     template_keys = [
         "order_details_title",
         "order_details_store",
@@ -659,63 +1069,62 @@ async def create_order_details_message(
         "order_details_total",
         "order_details_items_header",
     ]
-    static_texts = [REPLY_TEMPLATES.get(key, "") for key in template_keys]
+    title, store_label, time_label, total_label, items_header = (
+        await translate_templates_batch(
+            template_keys, user, translate_client, lang_code_map
+        )
+    )
 
-    # b. 動態文字：店家名稱
+    # --- 2. 動態文字：店家名稱與所有品項的原始名稱 ---
     store_name = order.store.store_name
-
-    # c. 動態文字：所有品項的原始名稱
     original_item_names = [
         item.original_name
         for item in order.items
         if item.original_name
     ]
 
-    # 將靜態標籤、店家名稱、品項名稱全部放入一個列表
-    all_texts_to_translate = static_texts + [store_name] + original_item_names
-
-    # --- 2. 執行單次批次翻譯 ---
-    translated_texts = await translate_texts_batch(
-        texts=all_texts_to_translate,
-        user=user,
-        translate_client=translate_client,
-        lang_code_map=lang_code_map,
+    # 執行批次翻譯，品項名稱在不同訂單間大量重複，已快取的部分不會再送出。
+    translated_texts = await translate_dynamic_texts(
+        [store_name] + original_item_names,
+        user,
+        translate_client,
+        lang_code_map,
     )
 
     # --- 3. 拆解翻譯結果 ---
-    num_static = len(static_texts)
-    
-    # a. 取得翻譯後的靜態標籤
-    title, store_label, time_label, total_label, items_header = translated_texts[:num_static]
-    
-    # b. 取得翻譯後的店家名稱
-    translated_store_name = translated_texts[num_static]
-    
-    # c. 取得翻譯後的品項名稱列表
-    translated_item_names = translated_texts[num_static + 1:]
-    
-    # d. 建立品項名稱的映射字典，方便後續查找
+    # a. 取得翻譯後的店家名稱
+    translated_store_name = translated_texts[0]
+
+    # b. 取得翻譯後的品項名稱列表
+    translated_item_names = translated_texts[1:]
+
+    # c. 建立品項名稱的映射字典，方便後續查找
     translation_map = dict(zip(original_item_names, translated_item_names))
 
     # --- 4. 組合最終訊息文字 ---
-    details_parts = [
-        f"<{title}>",
-        "--------------------",
-        f"{store_label}: {translated_store_name}",
-        f"{time_label}: {order.order_time.strftime('%Y-%m-%d %H:%M')}",
-        f"{total_label}: ${order.total_amount}",
-    ]
+    # 以預先定義的格式範本一次性產生訊息標頭。
+    reply_text = _ORDER_DETAILS_HEADER_FMT.format(
+        title=title,
+        store_label=store_label,
+        store_name=translated_store_name,
+        time_label=time_label,
+        time=order.order_time.strftime("%Y-%m-%d %H:%M"),
+        total_label=total_label,
+        total=order.total_amount,
+    )
 
     if order.items:
-        details_parts.append("\n" + f"{items_header}:")
-        for item in order.items:
-            # 從映射中取得翻譯名稱，如果找不到則備用為原始名稱
-            item_name = translation_map.get(item.original_name, item.original_name)
-            details_parts.append(
-                f"- {item_name} x {item.quantity_small}  (${item.subtotal})"
+        # 從映射中取得翻譯名稱，如果找不到則備用為原始名稱
+        item_lines = "\n".join(
+            _ORDER_DETAILS_ITEM_FMT.format(
+                name=translation_map.get(item.original_name, item.original_name),
+                quantity=item.quantity_small,
+                subtotal=item.subtotal,
             )
+            for item in order.items
+        )
+        reply_text = f"{reply_text}\n\n{items_header}:\n{item_lines}"
 
-    reply_text = "\n".join(details_parts)
     return TextMessage(text=reply_text)
 
 
@@ -738,5 +1147,13 @@ async def create_simple_text_message(
         lang_code_map=lang_code_map,
         **format_args,
     )
+    # 沒有動態變數的範本（如 `generic_error`、`user_not_found`）內容固定，
+    # 重用已建立的 `TextMessage`，省去每次重新建立與驗證模型的成本。
+    if not format_args:
+        message = _static_text_messages.get(text)
+        if message is None:
+            message = TextMessage(text=text)
+            _static_text_messages[text] = message
+        return message
     # 將文字包裝成 `TextMessage` 物件並返回。
     return TextMessage(text=text)
\ No newline at end of file
@@ -1,22 +1,25 @@
 # 導入第三方函式庫
 import aiohttp  # 用於執行非同步 HTTP 請求
+import orjson   # 高效能的 JSON 解析函式庫
 
 # 導入標準函式庫
 import asyncio  # 用於執行非同步操作
-import io       # 用於處理記憶體中的二進位資料流，如此處的圖片
-import json     # 用於解析 JSON 資料
+import base64   # 用於編碼 webhook 簽章
+import hashlib  # 提供 webhook 簽章使用的 SHA-256
+import hmac     # 用於計算與比對 webhook 簽章
 import logging  # 用於日誌記錄
-import os       # 用於與作業系統互動，如此處讀取檔案路徑
 
 # 導入非同步上下文管理器工具
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
+# 導入路徑處理工具
+from pathlib import Path
 # 導入型別提示
-from typing import Any, Dict, List
+from typing import List, Optional, Set
 
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request # FastAPI 核心元件
-from fastapi.responses import StreamingResponse # 用於串流回傳圖片等大型檔案
+from cachetools import TTLCache # 具存活時間與容量上限的快取，用於圖片代理
+from fastapi import FastAPI, HTTPException, Request # FastAPI 核心元件
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse # 用於回傳 webhook 的純文字回應、快取的圖片，以及串流回傳圖片等大型檔案
 from linebot.v3 import WebhookParser # 用於解析 LINE webhook 事件
-from linebot.v3.exceptions import InvalidSignatureError # 簽章驗證失敗時的例外
 from linebot.v3.messaging import ( # LINE Messaging API 的核心元件
     AsyncApiClient,
     AsyncMessagingApi as MessagingApi, # 將 AsyncMessagingApi 重新命名為 MessagingApi 方便使用
@@ -41,22 +44,19 @@ from . import clients, crud, line_messages # 導入客戶端初始化、資料
 from .config import Config # 導入設定檔
 from .constants import ActionType # 導入動作類型常數
 from .database import AsyncSessionLocal # 導入資料庫會話工廠
-from .dependencies import ( # 導入 FastAPI 依賴項
-    get_aiohttp_session,
-    get_lang_code_map,
-    get_language_display_texts,
-    get_native_language_list,
-    get_translate_client,
-)
 from .models import User # 導入使用者模型
 from .services import language_service, order_service, store_service, user_service # 導入所有服務層邏輯
 
 # 取得 uvicorn 的錯誤日誌記錄器，讓此處的日誌與伺服器日誌整合
 logger = logging.getLogger("uvicorn.error")
 
+# 靜態資料目錄與語言列表 JSON 檔案的路徑，在模組載入時解析一次
+_STATIC_DATA_DIR = Path(__file__).resolve().parent / "static" / "data"
+_NATIVE_LANG_JSON = _STATIC_DATA_DIR / "language_list_native.json"
+
 
 def _check_critical_configs():
-    """在應用程式啟動時檢查所有必要的環境變數是否已設定。"""
+    """在模組載入時檢查所有必要的環境變數是否已設定。"""
     # 定義一個字典，包含所有攸關系統運作的必要設定
     critical_vars = {
         "CHANNEL_ACCESS_TOKEN": Config.CHANNEL_ACCESS_TOKEN,
@@ -89,38 +89,89 @@ def _check_critical_configs():
         )
 
 
+# 在模組載入時（伺服器綁定連接埠之前）就檢查設定，設定缺失時程序會立即結束，
+# 不會先開始接收請求才在 lifespan 中失敗。
+_check_critical_configs()
+
+
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def _aiohttp_lifespan():
+    """建立共用的 aiohttp ClientSession，並在應用程式關閉時關閉。"""
+    # 明確設定連線池：放寬總連線數與單一主機的連線上限、快取 DNS 查詢結果，
+    # 並延長 keep-alive 時間，讓對 Google Places 的重複請求能重用既有的 TLS 連線。
+    connector = aiohttp.TCPConnector(
+        limit=512,
+        limit_per_host=64,
+        ttl_dns_cache=300,
+        keepalive_timeout=75,
+        enable_cleanup_closed=True,
+    )
+    # 請求主體（如 Google Places API 的 JSON payload）改用 orjson 序列化。
+    aiohttp_session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=15, connect=3),
+        json_serialize=lambda obj: orjson.dumps(obj).decode(),
+    )
+    logger.info("AIOHTTP ClientSession created.")
+    try:
+        yield aiohttp_session
+    finally:
+        await aiohttp_session.close()
+        logger.info("AIOHTTP ClientSession closed.")
+
+
+@asynccontextmanager
+async def _line_api_lifespan():
     """
-    FastAPI 的生命週期管理器。
-    `yield` 之前的程式碼會在應用程式啟動時執行一次。
-    `yield` 之後的程式碼會在應用程式關閉時執行一次。
+    建立全域共用的 LINE Messaging API 客戶端，讓所有事件的回覆/推播重用同一個連線池，
+    避免每個事件都重新建立連線並進行 TCP/TLS 交握。
     """
-    # --- 應用程式啟動 ---
-    
-    # 1. 檢查關鍵設定檔
-    _check_critical_configs()
+    line_api_client = AsyncApiClient(line_config)
+    logger.info("LINE AsyncApiClient created.")
+    try:
+        yield MessagingApi(line_api_client)
+    finally:
+        await line_api_client.close()
+        logger.info("LINE AsyncApiClient closed.")
 
-    # 2. 初始化並儲存共用資源到 app.state 中
-    # `app.state` 是一個可以讓你在應用程式生命週期內儲存任意物件的地方
-    app.state.aiohttp_session = aiohttp.ClientSession()
-    logger.info("AIOHTTP ClientSession created.")
 
-    app.state.translate_client = clients.initialize_google_clients()
+async def _warm_up_data(
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+    ready_event: asyncio.Event,
+):
+    """
+    在背景載入初始資料並預先翻譯回覆範本，完成後設定 `ready_event`。
+    載入的資料直接寫入 lifespan state 中的同一個 dict/list 物件，讓已在處理中的請求也能看到。
+    """
+    try:
+        await _load_initial_data(
+            translate_client, lang_code_map, native_language_list, language_display_texts
+        )
+    except Exception as e:
+        # 載入失敗時仍標記為就緒：各處理流程在缺少翻譯快取時會即時翻譯或退回原文，
+        # 避免 webhook 事件永遠等待。
+        logger.error(f"Failed to warm up initial data: {e}", exc_info=True)
+    ready_event.set()
+
 
+async def _load_initial_data(
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+):
+    """載入語言資料並預先翻譯回覆範本，結果直接寫入傳入的 dict/list 物件。"""
     logger.info("Application startup: Concurrently loading initial data...")
 
-    # 3. 同時（並行）載入需要的初始資料，以加速啟動
-    
+    # 1. 同時（並行）載入需要的初始資料，以加速啟動
+
     # 定義一個同步函式來讀取本地 JSON 檔案
     def load_native_languages_sync():
         try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            json_path = os.path.join(
-                current_dir, "static", "data", "language_list_native.json"
-            )
-            with open(json_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return orjson.loads(_NATIVE_LANG_JSON.read_bytes())
         except Exception as e:
             logger.warning(f"Failed to load language_list_native.json: {e}")
             return []
@@ -145,69 +196,202 @@ async def lifespan(app: FastAPI):
         return lang_map
 
     # 使用 `asyncio.gather` 來同時執行讀取資料庫和讀取檔案這兩個任務
-    results = await asyncio.gather(load_db_mappings(), load_languages_task)
+    loaded_lang_map, loaded_languages = await asyncio.gather(
+        load_db_mappings(), load_languages_task
+    )
+    lang_code_map.update(loaded_lang_map)
+    native_language_list.extend(loaded_languages)
+
+    # 2. 預先翻譯所有回覆範本，讓一般請求只需查詢記憶體快取。
+    #    每種目標語言只送出一次批次翻譯請求，包含下方語言選單顯示文字所用的範本。
+    #    先載入上次啟動時儲存的磁碟快取，只有快取中缺少的語言才需要呼叫翻譯 API。
+    if translate_client:
+        loaded_lang_count = await asyncio.to_thread(
+            line_messages.load_template_cache_file, Config.TEMPLATE_TRANSLATION_CACHE_PATH
+        )
+        logger.info(f"Loaded cached reply templates for {loaded_lang_count} languages from disk.")
 
-    # 將載入的結果存入 app.state
-    app.state.lang_code_map = results[0]
-    app.state.native_language_list = results[1]
+        logger.info("Pre-translating reply templates...")
+        cached_lang_count = await line_messages.preload_template_translations(
+            translate_client,
+            lang_code_map,
+            [lang_item["lang_code"] for lang_item in native_language_list],
+        )
+        logger.info(f"Successfully cached reply templates for {cached_lang_count} languages.")
 
-    # 4. 預先翻譯並快取語言選單中會用到的顯示文字，提升後續回應速度
+        # 有新翻譯的語言時，更新磁碟快取。
+        if cached_lang_count:
+            await asyncio.to_thread(
+                line_messages.save_template_cache_file, Config.TEMPLATE_TRANSLATION_CACHE_PATH
+            )
+
+    # 3. 預先產生並快取語言選單中會用到的顯示文字，提升後續回應速度。
+    #    `setting_language_to` 範本已在上一步翻譯並快取，這裡只需格式化，不會再呼叫翻譯 API。
     logger.info("Pre-translating language display texts...")
-    app.state.language_display_texts = {}
-    if app.state.translate_client:
+    if translate_client:
         tasks = []
-        for lang_item in app.state.native_language_list:
+        for lang_item in native_language_list:
             lang_code = lang_item["lang_code"]
             lang_name = lang_item["lang_name"][0]
-            # 為每種語言建立一個翻譯任務
+            # 為每種語言建立一個取得顯示文字的任務
             task = line_messages.get_translated_text_for_target_lang(
                 template_key="setting_language_to",
                 target_line_lang_code=lang_code,
-                translate_client=app.state.translate_client,
-                lang_code_map=app.state.lang_code_map,
+                translate_client=translate_client,
+                lang_code_map=lang_code_map,
                 lang_name=lang_name,
             )
             tasks.append((lang_code, task))
 
-        # 使用 `asyncio.gather` 同時執行所有翻譯任務
+        # 使用 `asyncio.gather` 同時執行所有任務（若上一步有語言翻譯失敗，會在此補翻譯）
         translated_results = await asyncio.gather(*[t[1] for t in tasks])
-        
+
         # 將翻譯結果存入快取字典
         for i, (lang_code, _) in enumerate(tasks):
-            app.state.language_display_texts[lang_code] = translated_results[i]
+            language_display_texts[lang_code] = translated_results[i]
 
         logger.info(
-            f"Successfully cached {len(app.state.language_display_texts)} language display texts."
+            f"Successfully cached {len(language_display_texts)} language display texts."
         )
     else:
         logger.warning(
             "Translate client not available. Skipping pre-translation of display texts."
         )
-    
-    logger.info("Successfully loaded and formatted initial data into app.state.")
 
-    # `yield` 關鍵字：到此，啟動程序完成。FastAPI 開始接收請求。
-    yield
+    logger.info("Successfully loaded and formatted initial data into lifespan state.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    FastAPI 的生命週期管理器。
+    `yield` 之前的程式碼會在應用程式啟動時執行一次。
+    `yield` 之後的程式碼會在應用程式關閉時執行一次。
+    啟動時只建立共用的客戶端便立即開始接收請求；較耗時的資料載入與預先翻譯在背景執行，
+    完成前 `/health/ready` 回傳 503，webhook 事件則會等到資料就緒後才開始處理。
+    """
+    # --- 應用程式啟動 ---
+    # 關鍵設定檔已在模組載入時檢查過。
+
+    async with AsyncExitStack() as stack:
+        # 1. 初始化共用資源，各資源由自己的上下文管理器負責建立與關閉
+        # 這些資源會在啟動完成時透過 `yield` 交給 ASGI lifespan state，之後每個請求都能從 `request.state` 取得
+        aiohttp_session = await stack.enter_async_context(_aiohttp_lifespan())
+        messaging_api = await stack.enter_async_context(_line_api_lifespan())
+        translate_client = await clients.initialize_translate_client()
+
+        # 2. 在背景載入初始資料，資料會在完成後填入下列物件
+        lang_code_map: dict = {}
+        native_language_list: list = []
+        language_display_texts: dict = {}
+        ready_event = asyncio.Event()
+        warm_up_task = asyncio.create_task(
+            _warm_up_data(
+                translate_client,
+                lang_code_map,
+                native_language_list,
+                language_display_texts,
+                ready_event,
+            )
+        )
 
-    # --- 應用程式關閉 ---
-    # `yield` 之後的程式碼在應用程式收到關閉信號時執行
-    await app.state.aiohttp_session.close()
-    logger.info("AIOHTTP ClientSession closed.")
+        # `yield` 關鍵字：到此，啟動程序完成。FastAPI 開始接收請求。
+        # yield 出的字典即為 ASGI lifespan state，伺服器會將其淺複製到每個請求的 `request.state` 中，
+        # 讓依賴項以字典查找取得共用資源，而不需經過 `app.state`。
+        yield {
+            "aiohttp_session": aiohttp_session,
+            "messaging_api": messaging_api,
+            "translate_client": translate_client,
+            "lang_code_map": lang_code_map,
+            "native_language_list": native_language_list,
+            "language_display_texts": language_display_texts,
+            "ready_event": ready_event,
+        }
+
+        # --- 應用程式關閉 ---
+        # `yield` 之後的程式碼在應用程式收到關閉信號時執行
+        # 取消仍在執行的預熱任務並等待其結束，避免它在共用客戶端關閉後仍繼續呼叫翻譯 API。
+        if not warm_up_task.done():
+            warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+        # 先等待仍在處理中的 webhook 事件完成，避免共用資源在任務執行途中被關閉。
+        if _bg_tasks:
+            logger.info(f"Waiting for {len(_bg_tasks)} pending event tasks...")
+            await asyncio.wait(_bg_tasks, timeout=10)
+        # 離開 `AsyncExitStack` 時，會依相反順序關閉 LINE 客戶端與 aiohttp session。
     logger.info("Application shutdown.")
 
 
+# Google Places Photo API 的 URL 範本，API 金鑰在模組載入時填入，每個請求只需代入 `photo_name`
+_PLACES_PHOTO_URL_TMPL = (
+    "https://places.googleapis.com/v1/{}/media"
+    f"?maxHeightPx=1024&key={Config.MAPS_API_KEY}"
+)
+
+# 圖片代理串流轉送時每次讀取的區塊大小（位元組）
+PHOTO_STREAM_CHUNK_SIZE = 64 * 1024
+# 單張圖片可被快取的大小上限（位元組），超過此大小的圖片只轉送、不快取
+PHOTO_CACHE_MAX_ITEM_BYTES = 1024 * 1024
+# 圖片快取的總容量上限（位元組）與存活時間（秒）
+PHOTO_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PHOTO_CACHE_TTL_SECONDS = 6 * 3600
+
+# Google Place 圖片的行程內快取，Key 為 `photo_name`，Value 為 (content_type, 圖片內容)。
+# 同一個 `photo_name` 的圖片內容不會改變，附近店家的圖片又常被不同使用者重複瀏覽，命中率很高。
+# 以圖片位元組數計算容量，確保快取佔用的記憶體有上限；超過容量時淘汰最久未使用的項目。
+_photo_cache: TTLCache = TTLCache(
+    maxsize=PHOTO_CACHE_MAX_BYTES,
+    ttl=PHOTO_CACHE_TTL_SECONDS,
+    getsizeof=lambda item: len(item[1]),
+)
+
+# 店家介紹快取的容量上限與存活時間（秒）
+STORE_SUMMARY_CACHE_MAX_SIZE = 5_000
+STORE_SUMMARY_CACHE_TTL_SECONDS = 3600
+
+# 店家介紹訊息的行程內快取，Key 為 (store_id, 語言代碼)，Value 為已建立的 `TextMessage`。
+# 店家介紹的翻譯很少變動，熱門店家又會被許多使用者重複點擊，命中時不需查詢資料庫也不需重新建立訊息物件。
+# 查無介紹的結果不快取，讓之後新增的翻譯能立即生效。
+_store_summary_cache: TTLCache = TTLCache(
+    maxsize=STORE_SUMMARY_CACHE_MAX_SIZE, ttl=STORE_SUMMARY_CACHE_TTL_SECONDS
+)
+
+# 處理中的 webhook 事件背景任務，保留強參照直到任務完成
+_bg_tasks: Set[asyncio.Task] = set()
+
 # 建立 FastAPI 應用程式實例，並傳入生命週期管理器
-app = FastAPI(title="LinguaOrderTalk Bot Service", lifespan=lifespan)
+# 預設以 orjson 序列化 JSON 回應
+app = FastAPI(
+    title="LinguaOrderTalk Bot Service",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 # 使用設定檔中的 Access Token 初始化 LINE SDK 的設定
 line_config = Configuration(access_token=Config.CHANNEL_ACCESS_TOKEN)
-# 使用設定檔中的 Channel Secret 初始化 webhook 解析器，用於驗證簽章
-parser = WebhookParser(Config.CHANNEL_SECRET)
+# 使用設定檔中的 Channel Secret 初始化 webhook 解析器。
+# 簽章已在 `callback` 中先行驗證，解析器略過自身的驗證，避免每個請求重複計算一次 HMAC。
+parser = WebhookParser(Config.CHANNEL_SECRET, skip_signature_verification=lambda: True)
+# 預先編碼的 Channel Secret，供 webhook 簽章驗證使用，避免每個請求重新編碼
+_channel_secret_bytes = Config.CHANNEL_SECRET.encode("utf-8")
+
+
+@app.get("/health")
+@app.get("/health/live")
+async def health_live():
+    """存活檢查：只要程序能回應請求即視為存活。"""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready(request: Request):
+    """就緒檢查：啟動時的資料載入與預先翻譯完成前回傳 503。"""
+    if not request.state.ready_event.is_set():
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
 
 
 @app.get("/api/v1/places/photo/{photo_name:path}")
-async def get_google_place_photo(
-    photo_name: str, aiohttp_session: aiohttp.ClientSession = Depends(get_aiohttp_session)
-):
+async def get_google_place_photo(photo_name: str, request: Request):
     """
     一個代理 API 端點，用於安全地取得 Google Place 的照片。
     `photo_name` 是一個路徑參數，可以包含斜線 (`/`)。
@@ -218,26 +402,19 @@ async def get_google_place_photo(
         logger.error("MAPS_API_KEY is not configured. Cannot proxy photo request.")
         raise HTTPException(status_code=500, detail="Server configuration error.")
 
+    # 命中快取時直接回傳，不需再向 Google 請求。
+    cached_photo = _photo_cache.get(photo_name)
+    if cached_photo is not None:
+        content_type, content = cached_photo
+        return Response(content=content, media_type=content_type)
+
     # 組合 Google Places Photo API 的實際 URL
-    google_photo_url = (
-        f"https://places.googleapis.com/v1/{photo_name}/media"
-        f"?maxHeightPx=1024&key={Config.MAPS_API_KEY}"
-    )
+    google_photo_url = _PLACES_PHOTO_URL_TMPL.format(photo_name)
 
     try:
-        # 使用共用的 aiohttp session 發送 GET 請求到 Google
-        async with aiohttp_session.get(google_photo_url) as response:
-            # 如果 Google 回應錯誤狀態碼，則拋出例外
-            response.raise_for_status()
-
-            # 取得回應的內容類型 (e.g., 'image/jpeg')
-            content_type = response.headers.get("Content-Type")
-
-            # 讀取圖片的二進位內容
-            content = await response.read()
-            # 使用 StreamingResponse 將圖片內容串流回傳給客戶端，這樣更有效率
-            return StreamingResponse(io.BytesIO(content), media_type=content_type)
-
+        # 使用共用的 aiohttp session 發送 GET 請求到 Google。
+        # 不使用 `async with`，因為回應主體要在函式返回後才由 StreamingResponse 逐塊讀取。
+        response = await request.state.aiohttp_session.get(google_photo_url)
     except aiohttp.ClientError as e:
         # 如果請求失敗，記錄錯誤並回傳 502 Bad Gateway 錯誤
         logger.error(f"Failed to fetch photo from Google Places API. Error: {e}")
@@ -245,18 +422,59 @@ async def get_google_place_photo(
             status_code=502, detail="Failed to retrieve image from upstream service."
         )
 
+    try:
+        # 如果 Google 回應錯誤狀態碼，則拋出例外
+        response.raise_for_status()
+    except aiohttp.ClientResponseError as e:
+        # 釋放連線回連線池，並回傳 502 Bad Gateway 錯誤
+        response.release()
+        logger.error(f"Failed to fetch photo from Google Places API. Error: {e}")
+        raise HTTPException(
+            status_code=502, detail="Failed to retrieve image from upstream service."
+        )
+
+    content_type = response.headers.get("Content-Type")
+
+    async def _iter_photo():
+        # 逐塊將上游的圖片內容轉送給客戶端，不需先把整張圖片讀進記憶體。
+        # 同時在大小上限內保留一份副本，完整讀取後寫入快取。
+        buffer = bytearray()
+        cacheable = True
+        try:
+            async for chunk in response.content.iter_chunked(PHOTO_STREAM_CHUNK_SIZE):
+                if cacheable:
+                    buffer.extend(chunk)
+                    if len(buffer) > PHOTO_CACHE_MAX_ITEM_BYTES:
+                        # 圖片過大，放棄快取並釋放已保留的副本。
+                        cacheable = False
+                        buffer = bytearray()
+                yield chunk
+            if cacheable and buffer:
+                _photo_cache[photo_name] = (content_type, bytes(buffer))
+        finally:
+            # 不論串流正常結束或客戶端中途斷線，都將連線釋放回連線池。
+            response.release()
+
+    # 轉送上游的 Content-Length 與 Cache-Control 標頭，讓客戶端能顯示進度並自行快取。
+    # aiohttp 預設會解壓縮帶有 Content-Encoding 的回應，此時串流內容長度與上游標頭不符，不轉送 Content-Length。
+    forward_names = ("Cache-Control",) if "Content-Encoding" in response.headers else (
+        "Content-Length", "Cache-Control"
+    )
+    forward_headers = {
+        name: response.headers[name]
+        for name in forward_names
+        if name in response.headers
+    }
+    # 使用 StreamingResponse 將圖片內容串流回傳給客戶端
+    return StreamingResponse(
+        _iter_photo(),
+        media_type=content_type,
+        headers=forward_headers,
+    )
+
 
 @app.post("/callback")
-async def callback(
-    request: Request,
-    background_tasks: BackgroundTasks,
-    # 以下都是透過 FastAPI 的依賴注入系統，從 `dependencies.py` 取得的共用資源
-    aiohttp_session: aiohttp.ClientSession = Depends(get_aiohttp_session),
-    translate_client=Depends(get_translate_client),
-    lang_code_map: Dict[str, Any] = Depends(get_lang_code_map),
-    native_language_list: List[Dict[str, Any]] = Depends(get_native_language_list),
-    language_display_texts: Dict[str, str] = Depends(get_language_display_texts),
-):
+async def callback(request: Request) -> PlainTextResponse:
     """
     接收 LINE 平台 webhook 事件的主要端點。
     """
@@ -264,43 +482,66 @@ async def callback(
     signature = request.headers.get("X-Line-Signature", "")
     # 取得請求的原始內容 (body)
     body = await request.body()
-    try:
-        # 使用 parser 驗證簽章並解析事件內容
-        events = parser.parse(body.decode("utf-8"), signature)
-    except InvalidSignatureError:
-        # 如果簽章無效，回傳 400 錯誤
+    # 先自行以 HMAC-SHA256 驗證簽章，無效的請求可直接拒絕，不需進入執行緒。
+    expected_signature = base64.b64encode(
+        hmac.new(_channel_secret_bytes, body, hashlib.sha256).digest()
+    )
+    if not hmac.compare_digest(expected_signature, signature.encode("utf-8")):
         raise HTTPException(status_code=400, detail="Invalid signature")
 
+    # 使用 parser 解析事件內容。LINE 可能在單一請求中批次送出多個事件，
+    # 將事件模型的反序列化放到背景執行緒，避免大型請求阻塞事件循環。
+    events = await asyncio.to_thread(parser.parse, body.decode("utf-8"), signature)
+
+    # 共用資源在啟動後不會改變，直接從 lifespan state 帶入的 `request.state` 讀取，
+    # 省去每個請求都經過 FastAPI 依賴注入解析多個 `Depends` 的開銷。
+    state = request.state
+
     # 遍歷所有解析出來的事件
     for event in events:
-        # 對於每一個事件，將其處理邏輯 `handle_single_event_task` 作為一個背景任務加入。
-        # FastAPI 會在回傳 `200 OK` 給 LINE 平台之後，才在背景執行這些任務。
-        # 這是處理 LINE webhook 的標準做法，可以避免因處理時間過長導致 LINE 平台認為請求失敗。
-        background_tasks.add_task(
-            handle_single_event_task,
-            event=event,
-            aiohttp_session=aiohttp_session,
-            translate_client=translate_client,
-            lang_code_map=lang_code_map,
-            native_language_list=native_language_list,
-            language_display_texts=language_display_texts,
+        # 對於每一個事件，將其處理邏輯 `handle_single_event_task` 排程為獨立的背景任務。
+        # 不等待任務完成就回傳 `200 OK`，避免因處理時間過長導致 LINE 平台認為請求失敗。
+        # 與 BackgroundTasks 逐一依序執行不同，同一個 webhook 內的多個事件會同時處理，
+        # 回覆延遲取決於最慢的事件，而不是所有事件的總和。
+        task = asyncio.create_task(
+            handle_single_event_task(
+                event=event,
+                aiohttp_session=state.aiohttp_session,
+                messaging_api=state.messaging_api,
+                translate_client=state.translate_client,
+                lang_code_map=state.lang_code_map,
+                native_language_list=state.native_language_list,
+                language_display_texts=state.language_display_texts,
+                ready_event=state.ready_event,
+            )
         )
-    # 立即回傳 "OK"，表示已成功接收到事件
-    return "OK"
+        # 事件循環只保留對任務的弱參照，需自行保留強參照，避免任務執行中途被垃圾回收。
+        _bg_tasks.add(task)
+        task.add_done_callback(_bg_tasks.discard)
+    # 立即回傳 "OK"，表示已成功接收到事件。
+    # 直接回傳純文字回應，省去 FastAPI 將字串經過 JSON 序列化的處理。
+    return PlainTextResponse("OK")
 
 
 async def handle_single_event_task(
     event,
     aiohttp_session: aiohttp.ClientSession,
+    messaging_api: MessagingApi,
     translate_client,
     lang_code_map: dict,
     native_language_list: list,
     language_display_texts: dict,
+    ready_event: asyncio.Event,
 ):
     """
     在背景執行的單一事件處理函式。
     """
+    # 啟動時的資料載入仍在進行中時，先等待完成，確保語言資料與翻譯快取已就緒。
+    await ready_event.wait()
+
     # 建立一個非同步資料庫會話，使用 `async with` 確保會話在使用後能被正確關閉。
+    # AsyncSession 只有在第一次執行查詢時才會向連線池取得連線，
+    # 因此不需查詢資料庫的事件（例如快取命中的變更語言按鈕）不會佔用連線。
     async with AsyncSessionLocal() as db:
 
         # 定義一個巢狀函式，用於在發生未知錯誤時，嘗試發送一則通用的錯誤訊息給使用者。
@@ -313,116 +554,65 @@ async def handle_single_event_task(
                     translate_client=translate_client,
                     lang_code_map=lang_code_map,
                 )
-                async with AsyncApiClient(line_config) as api_client:
-                    messaging_api = MessagingApi(api_client)
-                    # 如果事件有 reply_token，就用 replyMessage
-                    if hasattr(event, "reply_token") and event.reply_token:
-                        await messaging_api.reply_message(
-                            ReplyMessageRequest(
-                                reply_token=event.reply_token, messages=[error_message]
-                            )
+                # 使用共用的 messaging_api 發送訊息
+                # 以 `getattr` 搭配預設值取屬性，避免 `hasattr` 在屬性不存在時內部拋出再捕捉例外。
+                # 如果事件有 reply_token，就用 replyMessage
+                reply_token = getattr(event, "reply_token", None)
+                user_id = getattr(getattr(event, "source", None), "user_id", None)
+                if reply_token:
+                    await messaging_api.reply_message(
+                        ReplyMessageRequest(
+                            reply_token=reply_token, messages=[error_message]
                         )
-                    # 否則，如果能取得 user_id，就用 pushMessage
-                    elif hasattr(event, "source") and hasattr(event.source, "user_id"):
-                        await messaging_api.push_message(
-                            PushMessageRequest(
-                                to=event.source.user_id, messages=[error_message]
-                            )
+                    )
+                # 否則，如果能取得 user_id，就用 pushMessage
+                elif user_id:
+                    await messaging_api.push_message(
+                        PushMessageRequest(
+                            to=user_id, messages=[error_message]
                         )
+                    )
             except Exception as e:
                 logger.error(f"Failed to send error message to user: {e}")
 
         # 使用一個大的 try...except 區塊來捕捉處理過程中所有的可能錯誤
         try:
             # --- 事件路由邏輯 ---
-            # 判斷事件類型
-            if isinstance(event, FollowEvent):
-                # 如果是使用者加入好友或解除封鎖事件
-                await user_service.handle_new_user_follow(
-                    db, event.source.user_id, translate_client, lang_code_map
-                )
-                return # 處理完畢，直接返回
-
-            elif isinstance(event, MessageEvent):
-                # 如果是訊息事件
-                user = await crud.get_user_by_line_id(db, event.source.user_id)
-                if not user:
-                    # 如果在資料庫找不到使用者，準備一則 "user not found" 訊息
-                    reply_messages = [
-                        await line_messages.create_simple_text_message(
-                            None,
-                            "user_not_found",
-                            translate_client=translate_client,
-                            lang_code_map=lang_code_map,
-                        )
-                    ]
-                else:
-                    # 根據訊息的具體內容類型，分派到不同的處理器
-                    if isinstance(event.message, TextMessageContent):
-                        # 文字訊息
-                        reply_messages = await process_text_command(
-                            user,
-                            event.message.text,
-                            db,
-                            translate_client,
-                            lang_code_map,
-                            native_language_list,
-                            language_display_texts,
-                        )
-                    elif isinstance(event.message, LocationMessageContent):
-                        # 位置訊息
-                        reply_messages = await handle_location_message(
-                            event, user, db, aiohttp_session, translate_client, lang_code_map
-                        )
-                    elif isinstance(event.message, StickerMessageContent):
-                        # 貼圖訊息，當作未知指令處理，回傳主選單
-                        reply_messages = await user_service.handle_unknown_command(
-                            user, translate_client, lang_code_map
-                        )
-
-            elif isinstance(event, PostbackEvent):
-                # 如果是 Postback 事件（使用者點擊了 PostbackAction 按鈕）
-                user = await crud.get_user_by_line_id(db, event.source.user_id)
-                if not user:
-                    reply_messages = [
-                        await line_messages.create_simple_text_message(
-                            None,
-                            "user_not_found",
-                            translate_client=translate_client,
-                            lang_code_map=lang_code_map,
-                        )
-                    ]
-                else:
-                    reply_messages = await handle_postback(
-                        event,
-                        user,
-                        db,
-                        translate_client,
-                        lang_code_map,
-                        native_language_list,
-                        language_display_texts,
-                    )
-
-            else:
+            # 依事件的型別從分派表取得處理器，一次字典查找取代逐一 `isinstance` 判斷。
+            handler = EVENT_HANDLERS.get(type(event))
+            if handler is None:
                 # 如果是其他未處理的事件類型，直接返回
                 return
 
+            reply_messages = await handler(
+                event,
+                db,
+                aiohttp_session,
+                messaging_api,
+                translate_client,
+                lang_code_map,
+                native_language_list,
+                language_display_texts,
+            )
+            if not reply_messages:
+                # 處理器不需要回覆（例如加入好友事件），直接返回
+                return
+
+            # 回覆訊息已建立完成，不再需要資料庫。先結束會話，將連線歸還連線池，
+            # 避免在等待 LINE API 回應的期間持續佔用連線。
+            await db.close()
+
             # 如果前面邏輯產生了需要回覆的訊息 (`reply_messages`)
-            async with AsyncApiClient(line_config) as api_client:
-                # 呼叫 LINE API 的 replyMessage 方法來回覆訊息
-                await MessagingApi(api_client).reply_message(
-                    ReplyMessageRequest(
-                        reply_token=event.reply_token, messages=reply_messages
-                    )
+            # 呼叫 LINE API 的 replyMessage 方法來回覆訊息
+            await messaging_api.reply_message(
+                ReplyMessageRequest(
+                    reply_token=event.reply_token, messages=reply_messages
                 )
+            )
 
         except Exception as e:
             # 如果在整個處理過程中發生任何未被捕獲的例外
-            user_id = (
-                event.source.user_id
-                if hasattr(event, "source") and hasattr(event.source, "user_id")
-                else "N/A"
-            )
+            user_id = getattr(getattr(event, "source", None), "user_id", None) or "N/A"
             # 記錄詳細的錯誤日誌，包括錯誤資訊和堆疊追蹤
             logger.error(
                 f"Error processing event for user {user_id}: {event}", exc_info=True
@@ -431,6 +621,176 @@ async def handle_single_event_task(
             await _send_error_reply(event)
 
 
+async def _user_not_found_reply(translate_client, lang_code_map: dict) -> List[Message]:
+    """在資料庫找不到使用者時，準備一則 "user not found" 訊息。"""
+    return [
+        await line_messages.create_simple_text_message(
+            None,
+            "user_not_found",
+            translate_client=translate_client,
+            lang_code_map=lang_code_map,
+        )
+    ]
+
+
+async def _handle_follow_event(
+    event: FollowEvent,
+    db: AsyncSession,
+    aiohttp_session: aiohttp.ClientSession,
+    messaging_api: MessagingApi,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> Optional[List[Message]]:
+    """處理使用者加入好友或解除封鎖事件，歡迎訊息由使用者服務直接推播，不需回覆。"""
+    await user_service.handle_new_user_follow(
+        db, event.source.user_id, translate_client, lang_code_map, messaging_api
+    )
+    return None
+
+
+async def _handle_message_event(
+    event: MessageEvent,
+    db: AsyncSession,
+    aiohttp_session: aiohttp.ClientSession,
+    messaging_api: MessagingApi,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> Optional[List[Message]]:
+    """處理訊息事件，依訊息內容的型別分派到不同的處理器。"""
+    # 位置訊息：Google Places 搜尋不需要使用者資料，也不存取資料庫，
+    # 先在背景發出請求，讓 API 的網路延遲與使用者查詢重疊。
+    places_task = None
+    if type(event.message) is LocationMessageContent:
+        loc = event.message
+        places_task = asyncio.create_task(
+            store_service.search_nearby_places(
+                aiohttp_session,
+                loc.latitude,
+                loc.longitude,
+                title=loc.title,
+                address=loc.address,
+            )
+        )
+
+    try:
+        user = await user_service.get_user_cached(db, event.source.user_id)
+    except BaseException:
+        if places_task is not None:
+            places_task.cancel()
+        raise
+    if not user:
+        if places_task is not None:
+            places_task.cancel()
+        return await _user_not_found_reply(translate_client, lang_code_map)
+
+    if places_task is not None:
+        return await handle_location_message(
+            event,
+            user,
+            db,
+            aiohttp_session,
+            translate_client,
+            lang_code_map,
+            prefetched_places=await places_task,
+        )
+
+    handler = MESSAGE_HANDLERS.get(type(event.message))
+    if handler is None:
+        # 未支援的訊息類型（如圖片、影片），不回覆
+        return None
+    return await handler(
+        event,
+        user,
+        db,
+        aiohttp_session,
+        translate_client,
+        lang_code_map,
+        native_language_list,
+        language_display_texts,
+    )
+
+
+async def _handle_postback_event(
+    event: PostbackEvent,
+    db: AsyncSession,
+    aiohttp_session: aiohttp.ClientSession,
+    messaging_api: MessagingApi,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> Optional[List[Message]]:
+    """處理 Postback 事件（使用者點擊了 PostbackAction 按鈕）。"""
+    user = await user_service.get_user_cached(db, event.source.user_id)
+    if not user:
+        return await _user_not_found_reply(translate_client, lang_code_map)
+
+    return await handle_postback(
+        event,
+        user,
+        db,
+        translate_client,
+        lang_code_map,
+        native_language_list,
+        language_display_texts,
+    )
+
+
+async def _handle_text_message(
+    event: MessageEvent,
+    user: User,
+    db: AsyncSession,
+    aiohttp_session: aiohttp.ClientSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    """文字訊息，交由文字指令處理器處理。"""
+    return await process_text_command(
+        user,
+        event.message.text,
+        db,
+        translate_client,
+        lang_code_map,
+        native_language_list,
+        language_display_texts,
+    )
+
+
+async def _handle_sticker_message(
+    event: MessageEvent,
+    user: User,
+    db: AsyncSession,
+    aiohttp_session: aiohttp.ClientSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    """貼圖訊息，當作未知指令處理，回傳主選單。"""
+    return await user_service.handle_unknown_command(
+        user, translate_client, lang_code_map
+    )
+
+
+# 事件類型與訊息內容類型的分派表，以 `type(...)` 作為 Key 進行一次字典查找。
+# 位置訊息需要預先發出店家搜尋，由 `_handle_message_event` 直接處理，不在分派表中。
+EVENT_HANDLERS = {
+    FollowEvent: _handle_follow_event,
+    MessageEvent: _handle_message_event,
+    PostbackEvent: _handle_postback_event,
+}
+MESSAGE_HANDLERS = {
+    TextMessageContent: _handle_text_message,
+    StickerMessageContent: _handle_sticker_message,
+}
+
+
 async def handle_location_message(
     event: MessageEvent,
     user: User,
@@ -438,9 +798,11 @@ async def handle_location_message(
     aiohttp_session: aiohttp.ClientSession,
     translate_client,
     lang_code_map: dict,
+    prefetched_places=None,
 ) -> List[Message]:
     """
     處理使用者傳送的位置訊息。
+    `prefetched_places` 為事先以 `store_service.search_nearby_places` 取得的搜尋結果。
     """
     loc = event.message
     # 呼叫店家服務，根據使用者位置尋找並同步附近的店家資料
@@ -451,6 +813,7 @@ async def handle_location_message(
         user_lng=loc.longitude,
         title=loc.title,
         address=loc.address,
+        prefetched_places=prefetched_places,
     )
 
     if not stores:
@@ -472,6 +835,160 @@ async def handle_location_message(
         ]
 
 
+async def _generic_error_reply(
+    user: User, translate_client, lang_code_map: dict
+) -> List[Message]:
+    """回傳一則通用的錯誤訊息。"""
+    return [
+        await line_messages.create_simple_text_message(
+            user,
+            "generic_error",
+            translate_client=translate_client,
+            lang_code_map=lang_code_map,
+        )
+    ]
+
+
+async def _postback_show_order_details(
+    data: dict,
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    """顯示訂單詳情。"""
+    raw_order_id = data.get("order_id")
+    try:
+        if raw_order_id is None:
+            raise ValueError("order_id is missing from postback data")
+
+        order_id = int(raw_order_id)
+    except (ValueError, TypeError):
+        # 如果 order_id 格式不正確，記錄錯誤並回傳通用錯誤訊息
+        logger.error(
+            f"Invalid order_id '{raw_order_id}' received in postback for user {user.line_user_id}."
+        )
+        return await _generic_error_reply(user, translate_client, lang_code_map)
+
+    # 呼叫訂單服務處理
+    return await order_service.handle_show_order_details_request(
+        db, user, order_id, translate_client, lang_code_map
+    )
+
+
+async def _postback_order_history(
+    data: dict,
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    """查詢歷史訂單，呼叫訂單服務處理。"""
+    return await order_service.handle_order_history_request(
+        db, user, translate_client, lang_code_map
+    )
+
+
+async def _postback_change_language(
+    data: dict,
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    """變更語言，呼叫語言服務處理。"""
+    return await language_service.handle_change_language_request(
+        user,
+        translate_client,
+        lang_code_map,
+        native_language_list,
+        language_display_texts,
+    )
+
+
+async def _postback_set_language(
+    data: dict,
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    """設定語言。"""
+    lang_code = data.get("lang_code")
+    # 寫入路徑不採用快取中的快照：其他執行個體可能已變更過語言，以資料庫中的最新資料判斷是否需要更新。
+    user = await crud.get_user_by_line_id(db, user.line_user_id) or user
+    # 呼叫語言服務處理
+    return await language_service.handle_set_language_request(
+        db, user, lang_code, translate_client, lang_code_map, native_language_list
+    )
+
+
+async def _postback_show_store_summary(
+    data: dict,
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    """顯示店家介紹。"""
+    raw_store_id = data.get("store_id")
+    try:
+        if raw_store_id is None:
+            raise ValueError("store_id is missing from postback data")
+
+        store_id = int(raw_store_id)
+    except (ValueError, TypeError):
+        logger.error(
+            f"Invalid store_id '{raw_store_id}' received in postback for user {user.line_user_id}."
+        )
+        return await _generic_error_reply(user, translate_client, lang_code_map)
+
+    # 優先從快取取得已建立的店家介紹訊息
+    cache_key = (store_id, user.preferred_lang)
+    summary_message = _store_summary_cache.get(cache_key)
+    if summary_message is not None:
+        return [summary_message]
+
+    # 直接呼叫 crud 函式查詢翻譯摘要
+    summary = await crud.get_store_translation_summary(
+        db, store_id, user.preferred_lang
+    )
+    if summary:
+        # 如果有摘要，直接回傳文字訊息
+        summary_message = TextMessage(text=summary)
+        _store_summary_cache[cache_key] = summary_message
+        return [summary_message]
+    # 如果沒有摘要，回傳 "not found" 訊息
+    return [
+        await line_messages.create_simple_text_message(
+            user,
+            "store_summary_not_found",
+            translate_client=translate_client,
+            lang_code_map=lang_code_map,
+        )
+    ]
+
+
+# Postback 動作類型與處理器的分派表
+POSTBACK_HANDLERS = {
+    ActionType.SHOW_ORDER_DETAILS: _postback_show_order_details,
+    ActionType.ORDER_HISTORY: _postback_order_history,
+    ActionType.CHANGE_LANGUAGE: _postback_change_language,
+    ActionType.SET_LANGUAGE: _postback_set_language,
+    ActionType.SHOW_STORE_SUMMARY: _postback_show_store_summary,
+}
+
+
 async def handle_postback(
     event: PostbackEvent,
     user: User,
@@ -485,123 +1002,89 @@ async def handle_postback(
     處理 Postback 事件。
     """
     try:
-        # 解析 postback data 欄位中的 JSON 字串
-        data = json.loads(event.postback.data)
+        # 解析 postback data 欄位中的 JSON 字串（使用 orjson，每次點擊按鈕都會經過此處）
+        data = orjson.loads(event.postback.data)
         # 取得 action 類型
         action_str = data.get("action")
 
         # --- Postback 路由邏輯 ---
-        if action_str == ActionType.SHOW_ORDER_DETAILS:
-            # 如果是 "顯示訂單詳情"
-            raw_order_id = data.get("order_id")
-            try:
-                if raw_order_id is None:
-                    raise ValueError("order_id is missing from postback data")
-                
-                order_id = int(raw_order_id)
-                # 呼叫訂單服務處理
-                return await order_service.handle_show_order_details_request(
-                    db, user, order_id, translate_client, lang_code_map
-                )
-
-            except (ValueError, TypeError):
-                # 如果 order_id 格式不正確，記錄錯誤並回傳通用錯誤訊息
-                logger.error(
-                    f"Invalid order_id '{raw_order_id}' received in postback for user {user.line_user_id}."
-                )
-                return [
-                    await line_messages.create_simple_text_message(
-                        user,
-                        "generic_error",
-                        translate_client=translate_client,
-                        lang_code_map=lang_code_map,
-                    )
-                ]
-
-        elif action_str == ActionType.ORDER_HISTORY:
-            # 如果是 "查詢歷史訂單"，呼叫訂單服務處理
-            return await order_service.handle_order_history_request(
-                db, user, translate_client, lang_code_map
-            )
-
-        elif action_str == ActionType.CHANGE_LANGUAGE:
-            # 如果是 "變更語言"，呼叫語言服務處理
-            return await language_service.handle_change_language_request(
-                user,
-                translate_client,
-                lang_code_map,
-                native_language_list,
-                language_display_texts,
-            )
-
-        elif action_str == ActionType.SET_LANGUAGE:
-            # 如果是 "設定語言"
-            lang_code = data.get("lang_code")
-            # 呼叫語言服務處理
-            return await language_service.handle_set_language_request(
-                db, user, lang_code, translate_client, lang_code_map, native_language_list
-            )
-
-        elif action_str == ActionType.SHOW_STORE_SUMMARY:
-            # 如果是 "顯示店家介紹"
-            raw_store_id = data.get("store_id")
-            try:
-                if raw_store_id is None:
-                    raise ValueError("store_id is missing from postback data")
-
-                store_id = int(raw_store_id)
-                # 直接呼叫 crud 函式查詢翻譯摘要
-                summary = await crud.get_store_translation_summary(
-                    db, store_id, user.preferred_lang
-                )
-                if summary:
-                    # 如果有摘要，直接回傳文字訊息
-                    return [TextMessage(text=summary)]
-                else:
-                    # 如果沒有摘要，回傳 "not found" 訊息
-                    return [
-                        await line_messages.create_simple_text_message(
-                            user,
-                            "store_summary_not_found",
-                            translate_client=translate_client,
-                            lang_code_map=lang_code_map,
-                        )
-                    ]
-
-            except (ValueError, TypeError):
-                logger.error(
-                    f"Invalid store_id '{raw_store_id}' received in postback for user {user.line_user_id}."
-                )
-                return [
-                    await line_messages.create_simple_text_message(
-                        user,
-                        "generic_error",
-                        translate_client=translate_client,
-                        lang_code_map=lang_code_map,
-                    )
-                ]
-        
-        else:
+        handler = POSTBACK_HANDLERS.get(action_str)
+        if handler is None:
             # 如果是未知的 action
             logger.warning(f"Unknown postback action '{action_str}' received.")
             return await user_service.handle_unknown_command(
                 user, translate_client, lang_code_map
             )
 
-    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        return await handler(
+            data,
+            user,
+            db,
+            translate_client,
+            lang_code_map,
+            native_language_list,
+            language_display_texts,
+        )
+
+    except (orjson.JSONDecodeError, ValueError, KeyError, TypeError) as e:
         # 如果 postback data 格式錯誤 (例如無法解析 JSON)，記錄錯誤並回傳通用錯誤訊息
         logger.error(
             f"Error processing postback data for user {user.line_user_id}: {e}",
             exc_info=True,
         )
-        return [
-            await line_messages.create_simple_text_message(
-                user,
-                "generic_error",
-                translate_client=translate_client,
-                lang_code_map=lang_code_map,
-            )
-        ]
+        return await _generic_error_reply(user, translate_client, lang_code_map)
+
+
+async def _text_order_now(
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    return await order_service.handle_order_now_request(
+        user, translate_client, lang_code_map
+    )
+
+
+async def _text_change_language(
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    return await language_service.handle_change_language_request(
+        user,
+        translate_client,
+        lang_code_map,
+        native_language_list,
+        language_display_texts,
+    )
+
+
+async def _text_order_history(
+    user: User,
+    db: AsyncSession,
+    translate_client,
+    lang_code_map: dict,
+    native_language_list: list,
+    language_display_texts: dict,
+) -> List[Message]:
+    return await order_service.handle_order_history_request(
+        db, user, translate_client, lang_code_map
+    )
+
+
+# 文字指令與處理器的分派表。
+# 這裡的指令是英文，因為主要互動是透過按鈕。這部分可以視為一個備用或開發時的快速指令。
+TEXT_COMMAND_HANDLERS = {
+    "order now": _text_order_now,
+    "change language": _text_change_language,
+    "order history": _text_order_history,
+}
 
 
 async def process_text_command(
@@ -620,28 +1103,18 @@ async def process_text_command(
     user_text = text.strip().lower()
 
     # --- 文字指令路由 ---
-    # 這裡的指令是英文，因為主要互動是透過按鈕。這部分可以視為一個備用或開發時的快速指令。
-    if user_text == "order now":
-        return await order_service.handle_order_now_request(
-            user, translate_client, lang_code_map
-        )
-
-    elif user_text == "change language":
-        return await language_service.handle_change_language_request(
-            user,
-            translate_client,
-            lang_code_map,
-            native_language_list,
-            language_display_texts,
-        )
-
-    elif user_text == "order history":
-        return await order_service.handle_order_history_request(
-            db, user, translate_client, lang_code_map
-        )
-
-    else:
+    handler = TEXT_COMMAND_HANDLERS.get(user_text)
+    if handler is None:
         # 如果不是任何已知的指令，回傳主選單
         return await user_service.handle_unknown_command(
             user, translate_client, lang_code_map
-        )
\ No newline at end of file
+        )
+
+    return await handler(
+        user,
+        db,
+        translate_client,
+        lang_code_map,
+        native_language_list,
+        language_display_texts,
+    )
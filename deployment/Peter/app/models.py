@@ -7,6 +7,7 @@ from sqlalchemy import (
     DateTime,         # 對應 SQL 的 DATETIME 或 TIMESTAMP 型別
     Float,            # 對應 SQL 的 FLOAT 型別，用於浮點數
     ForeignKey,       # 用於定義外鍵約束，建立資料表之間的關聯
+    Index,            # 用於定義資料表索引（包含多欄位的複合索引）
     Integer,          # 對應 SQL 的 INTEGER 型別
     Numeric,          # 對應 SQL 的 NUMERIC 或 DECIMAL 型別，用於需要精確小數的場景（如經緯度）
     String,           # 對應 SQL 的 VARCHAR 型別，用於儲存可變長度字串
@@ -17,7 +18,8 @@ from sqlalchemy.dialects.mysql import TINYINT
 # 導入 SQLAlchemy ORM 的核心元件
 # `declarative_base`: 是一個工廠函式，會回傳一個基底類別，我們定義的所有模型都將繼承它
 # `relationship`: 用於定義模型之間的關聯
-from sqlalchemy.orm import declarative_base, relationship
+# `deferred`: 將欄位標記為延遲載入，查詢時預設不會 SELECT 該欄位，直到第一次存取時才載入
+from sqlalchemy.orm import declarative_base, deferred, relationship
 
 # 建立一個所有 ORM 模型的基底類別 `Base`。
 # SQLAlchemy 的宣告式系統會透過這個基底類別來識別所有與資料庫對應的模型。
@@ -70,12 +72,23 @@ class Store(Base):
     )
     place_id = Column(String(255), nullable=True, unique=True, comment="Google Map Place ID")
 
+    # 座標欄位在 LINE Bot 的查詢流程中不會被讀取，以 `deferred` 延遲載入並歸為同一群組，
+    # 載入店家資料時不需 SELECT 這些欄位，也省去每一列建立兩個 `Decimal` 物件的成本；
+    # 若之後存取其中任一欄位，同群組的四個欄位會以一次查詢一併載入。
     # GPS 座標，使用 Float (DOUBLE)
-    gps_lat = Column(Float, nullable=True, comment="店家 GPS 緯度 (DOUBLE)")
-    gps_lng = Column(Float, nullable=True, comment="店家 GPS 經度 (DOUBLE)")
+    gps_lat = deferred(
+        Column(Float, nullable=True, comment="店家 GPS 緯度 (DOUBLE)"), group="coordinates"
+    )
+    gps_lng = deferred(
+        Column(Float, nullable=True, comment="店家 GPS 經度 (DOUBLE)"), group="coordinates"
+    )
     # GPS 座標，使用 Numeric (DECIMAL)，提供更高的精確度
-    latitude = Column(Numeric(10, 8), nullable=True, comment="店家緯度 (DECIMAL)")
-    longitude = Column(Numeric(11, 8), nullable=True, comment="店家經度 (DECIMAL)")
+    latitude = deferred(
+        Column(Numeric(10, 8), nullable=True, comment="店家緯度 (DECIMAL)"), group="coordinates"
+    )
+    longitude = deferred(
+        Column(Numeric(11, 8), nullable=True, comment="店家經度 (DECIMAL)"), group="coordinates"
+    )
 
     review_summary = Column(TEXT, nullable=True, comment="店家評論摘要")
     # 人氣菜色欄位
@@ -112,6 +125,9 @@ class StoreTranslation(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    # 歷史訂單查詢以 `user_id` 篩選並依 `order_time` 倒序排列，
+    # 複合索引讓 MySQL 直接以索引範圍掃描取得最新的 N 筆，不需對該使用者的所有訂單做 filesort。
+    __table_args__ = (Index("ix_orders_user_time", "user_id", "order_time"),)
 
     order_id = Column(BigInteger, primary_key=True)
     user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False) # 外鍵，關聯到使用者
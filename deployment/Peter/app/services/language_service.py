@@ -9,9 +9,34 @@ from sqlalchemy.ext.asyncio import AsyncSession
 # 從上層目錄 (`app/`) 導入 crud 和 line_messages 模組
 # `..` 表示上一層目錄，這是 Python 的相對導入語法
 from .. import crud, line_messages
+# 導入同層的使用者服務，用於在寫入後更新使用者快取
+from . import user_service
 # 同樣從上層目錄導入 User 模型，用於型別提示
 from ..models import User
 
+# 語言代碼與其標準名稱（如 "zh-Hant" -> "繁體中文"）的對照快取。
+# 語言列表在啟動後不會改變，查詢過一次的語言代碼之後只需一次字典查找，不需再逐一掃描列表。
+_canonical_lang_names: Dict[str, str] = {}
+
+
+def _get_canonical_lang_name(lang_code: str, native_language_list: list) -> str:
+    """取得語言代碼對應的標準語言名稱，找不到時返回語言代碼本身。"""
+    canonical_lang_name = _canonical_lang_names.get(lang_code)
+    if canonical_lang_name is None:
+        # 從完整的語言列表中，找到與 `lang_code` 對應的語言物件。
+        # `next(...)` 是一個迭代器工具，用於找到滿足條件的第一個元素。
+        lang_obj = next(
+            (item for item in native_language_list if item["lang_code"] == lang_code),
+            None, # 如果找不到，預設返回 None
+        )
+        if lang_obj is None:
+            # 找不到時不寫入快取，語言列表仍在載入中時，之後的查詢還有機會找到。
+            return lang_code
+        # 取得該語言的標準名稱（例如 "繁體中文"）。
+        canonical_lang_name = lang_obj["lang_name"][0]
+        _canonical_lang_names[lang_code] = canonical_lang_name
+    return canonical_lang_name
+
 
 async def handle_change_language_request(
     user: User,
@@ -53,31 +78,23 @@ async def handle_set_language_request(
     # 1. 驗證：檢查傳入的 `lang_code` 是否有效（非空且存在於我們支援的語言映射表中）。
     if lang_code and lang_code in lang_code_map:
         # 2. 更新資料庫：如果語言代碼有效，就呼叫 crud 函式來更新使用者在資料庫中的 `preferred_lang` 欄位。
-        # 同時也可能將使用者的狀態（state）重設為 "normal"。
-        await crud.update_user(db, user, preferred_lang=lang_code, state="normal")
+        # 同時也將使用者的狀態（state）重設為 "normal"。以單一 UPDATE 語句完成，不需事先重新查詢使用者。
+        await crud.update_user_language(db, user, lang_code, state="normal")
+        # 寫入已提交，以最新的使用者資料更新快取。
+        user_service.cache_user(user)
 
         # 3. 準備回覆訊息：
-        # 從完整的語言列表中，找到與使用者選擇的 `lang_code` 對應的語言物件。
-        # `next(...)` 是一個迭代器工具，用於找到滿足條件的第一個元素。
-        lang_obj = next(
-            (item for item in native_language_list if item["lang_code"] == lang_code),
-            None, # 如果找不到，預設返回 None
-        )
-        # 取得該語言的標準名稱（例如 "繁體中文"）。如果找不到物件，則備用為語言代碼本身。
-        canonical_lang_name = lang_obj["lang_name"][0] if lang_obj else lang_code
-
-        # 為了讓確認訊息更貼近使用者，將語言的標準名稱（如 "繁體中文"）
-        # 翻譯成使用者剛剛選擇的目標語言（如 "Traditional Chinese"）。
-        localized_name = await line_messages.localize_lang_name(
-            canonical_lang_name, lang_code, translate_client
-        )
+        # 取得該語言的標準名稱（例如 "繁體中文"）。如果找不到，則備用為語言代碼本身。
+        # 語言列表中的標準名稱本身就是以該語言書寫（如 "Deutsch"、"日本語"），
+        # 與使用者剛剛選擇的目標語言相同，不需再呼叫翻譯 API 進行在地化。
+        canonical_lang_name = _get_canonical_lang_name(lang_code, native_language_list)
 
         # 呼叫 `line_messages` 中的函式來建立一則成功設定的確認訊息。
         return [
             await line_messages.create_simple_text_message(
                 user, # 此時 user 物件的 preferred_lang 已經在記憶體中更新，所以這則訊息會以新語言發送
                 "language_set_success", # 訊息範本的 key
-                lang_name=localized_name, # 傳入要格式化的變數
+                lang_name=canonical_lang_name, # 傳入要格式化的變數
                 translate_client=translate_client,
                 lang_code_map=lang_code_map,
             )
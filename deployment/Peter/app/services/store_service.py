@@ -7,10 +7,15 @@ import logging
 # Dict: 表示字典型別。
 # List: 表示列表型別。
 # Optional: 表示一個值可以是某個指定型別，也可以是 None。
-from typing import Any, Dict, List, Optional
+# Tuple: 表示元組型別。
+from typing import Any, Dict, List, Optional, Tuple
 
 # 導入 aiohttp 模組，用於發送非同步 HTTP 請求。
 import aiohttp
+# 導入 orjson，用於快速解析 Google Places API 回傳的 JSON。
+import orjson
+# 具存活時間與容量上限的快取，用於暫存 Google Places 搜尋結果
+from cachetools import TTLCache
 # 從 sqlalchemy.ext.asyncio 導入 AsyncSession，用於型別提示資料庫會話物件。
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -24,26 +29,90 @@ from ..models import Store
 # 取得一個 logger 實例，用於記錄日誌。
 logger = logging.getLogger(__name__)
 
+# 地標店家需具備其中任一類型，才會被置於搜尋結果的最前端。
+_LANDMARK_FOOD_TYPES = frozenset({"restaurant", "food_store"})
 
-async def find_and_sync_nearby_stores(
-    db: AsyncSession,
+# Google Places API 請求的標頭在每次請求間都相同，於模組載入時建立一次。
+# 設置 Content-Type 為 JSON，並將 API 金鑰和欄位遮罩 (Field Mask) 加入標頭。
+_NEARBY_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Goog-Api-Key": Config.MAPS_API_KEY,
+    "X-Goog-FieldMask": Config.PLACES_NEARBY_FIELD_MASK,
+}
+_TEXT_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Goog-Api-Key": Config.MAPS_API_KEY,
+    "X-Goog-FieldMask": Config.PLACES_TEXT_FIELD_MASK,
+}
+
+# Google Places 搜尋結果快取的容量上限與存活時間（秒）
+PLACES_SEARCH_CACHE_MAX_SIZE = 2_000
+PLACES_SEARCH_CACHE_TTL_SECONDS = 600
+# 座標取到小數點後第 4 位（約 11 公尺）作為快取鍵，遠小於附近搜尋的半徑，搜尋結果幾乎相同。
+PLACES_SEARCH_CACHE_COORD_PRECISION = 4
+# Key 為 (緯度, 經度, 地標標題, 地標地址)，Value 為 `search_nearby_places` 的返回值。
+# 同一區域（商圈、地標）的使用者常在短時間內傳送相近的位置，命中時不需再呼叫付費的 Places API。
+# 任一 API 請求失敗時的結果不快取，避免暫時性錯誤被保留。
+_places_search_cache: TTLCache = TTLCache(
+    maxsize=PLACES_SEARCH_CACHE_MAX_SIZE, ttl=PLACES_SEARCH_CACHE_TTL_SECONDS
+)
+# 進行中的 Places 搜尋，Key 與 `_places_search_cache` 相同，Value 為共用的 asyncio 任務。
+_inflight_places_searches: Dict[
+    Tuple[float, float, Optional[str], Optional[str]],
+    "asyncio.Future[Tuple[List[Dict[str, Any]], Optional[str]]]",
+] = {}
+
+
+async def search_nearby_places(
     aiohttp_session: aiohttp.ClientSession,
     user_lat: float,
     user_lng: float,
     title: Optional[str] = None,
     address: Optional[str] = None,
-) -> List[Store]:
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    根據使用者位置，呼叫 Google Places API 搜尋附近的店家，
-    並將新店家同步到資料庫，最後返回一個排序後的店家列表。
+    根據使用者位置，呼叫 Google Places API 搜尋附近的店家。
+    此函式不存取資料庫，可與資料庫查詢同時執行。
+    返回 (店家列表, 地標店家的 Place ID)，地標店家（若有）位於列表最前端。
+    相近位置的搜尋結果會暫存一段時間，呼叫端不應修改返回的店家列表。
+    """
+    cache_key = (
+        round(user_lat, PLACES_SEARCH_CACHE_COORD_PRECISION),
+        round(user_lng, PLACES_SEARCH_CACHE_COORD_PRECISION),
+        title,
+        address,
+    )
+    cached_result = _places_search_cache.get(cache_key)
+    if cached_result is not None:
+        logger.info("Google Places search served from cache.")
+        return cached_result
+
+    # 快取尚未建立時，同一位置的多個搜尋（例如多位使用者同時在同一地標分享位置）共用同一個任務，
+    # 只呼叫一次 Places API。
+    task = _inflight_places_searches.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _call_places_api(aiohttp_session, user_lat, user_lng, title, address, cache_key)
+        )
+        _inflight_places_searches[cache_key] = task
+        # 任務完成（不論成功或失敗）後即從進行中清單移除，之後的請求改由快取處理或重新送出。
+        task.add_done_callback(lambda _: _inflight_places_searches.pop(cache_key, None))
+    # 使用 `asyncio.shield`，避免其中一個等待者被取消時連帶取消其他人共用的任務。
+    return await asyncio.shield(task)
+
+
+async def _call_places_api(
+    aiohttp_session: aiohttp.ClientSession,
+    user_lat: float,
+    user_lng: float,
+    title: Optional[str],
+    address: Optional[str],
+    cache_key: Tuple[float, float, Optional[str], Optional[str]],
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    實際呼叫 Google Places API 的 Nearby Search 與 Text Search，並整理搜尋結果。
+    所有請求皆成功時，將結果以 `cache_key` 寫入 `_places_search_cache`。
     """
-    # 準備 Google Places API Nearby Search 請求所需的標頭 (headers)。
-    # 設置 Content-Type 為 JSON，並將 API 金鑰和欄位遮罩 (Field Mask) 加入標頭。
-    nearby_headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": Config.MAPS_API_KEY,
-        "X-Goog-FieldMask": Config.PLACES_NEARBY_FIELD_MASK,
-    }
     # 準備 Nearby Search 請求的 JSON 主體 (payload)。
     # 包含要搜尋的主要類型、最大結果數、以使用者位置為中心的圓形區域限制，以及排序偏好和語言代碼。
     nearby_payload = {
@@ -63,7 +132,7 @@ async def find_and_sync_nearby_stores(
     tasks = []
     # 創建一個非同步任務，用於發送 Nearby Search 請求，並將其加入任務列表。
     nearby_task = aiohttp_session.post(
-        Config.PLACES_NEARBY_SEARCH_URL, headers=nearby_headers, json=nearby_payload
+        Config.PLACES_NEARBY_SEARCH_URL, headers=_NEARBY_HEADERS, json=nearby_payload
     )
     tasks.append(nearby_task)
 
@@ -72,12 +141,6 @@ async def find_and_sync_nearby_stores(
     # 如果使用者傳送的位置訊息包含標題 (title) 和地址 (address)，則執行文字搜尋。
     if title and address:
         logger.info(f"Executing Text Search for landmark: '{title}'")
-        # 準備 Text Search 請求所需的標頭。
-        text_headers = {
-            "Content-Type": "application/json",
-            "X-Goog-Api-Key": Config.MAPS_API_KEY,
-            "X-Goog-FieldMask": Config.PLACES_TEXT_FIELD_MASK,
-        }
         # 準備 Text Search 請求的 JSON 主體。
         # 使用使用者傳送的標題和地址作為查詢關鍵字。
         text_payload = {
@@ -93,7 +156,7 @@ async def find_and_sync_nearby_stores(
         }
         # 創建一個非同步任務，用於發送 Text Search 請求，並將其加入任務列表。
         text_task = aiohttp_session.post(
-            Config.PLACES_TEXT_SEARCH_URL, headers=text_headers, json=text_payload
+            Config.PLACES_TEXT_SEARCH_URL, headers=_TEXT_HEADERS, json=text_payload
         )
         tasks.append(text_task)
 
@@ -107,23 +170,27 @@ async def find_and_sync_nearby_stores(
     final_places: List[Dict[str, Any]] = []
     # 初始化變數，用於存放地標（由文字搜尋找到的店家）。
     landmark_place = None
+    # 記錄是否有任一 API 請求失敗，失敗時的結果不寫入快取。
+    search_failed = False
 
     # 處理 Nearby Search 的結果。
     nearby_result_or_exc = results[0]
     # 如果結果是一個例外，表示請求失敗。
     if isinstance(nearby_result_or_exc, Exception):
         logger.error(f"Google Nearby Search API request failed: {nearby_result_or_exc}")
+        search_failed = True
     else:
         try:
             # 檢查 HTTP 回應狀態碼，如果不是 2xx，則拋出例外。
             nearby_result_or_exc.raise_for_status()
-            # 解析 JSON 回應。
-            nearby_result = await nearby_result_or_exc.json()
+            # 解析 JSON 回應（以 orjson 直接解析原始位元組，比 aiohttp 內建的 json 模組更快）。
+            nearby_result = orjson.loads(await nearby_result_or_exc.read())
             # 從回應中提取店家列表。
             final_places = nearby_result.get("places", [])
             logger.info(f"Nearby Search found {len(final_places)} potential places.")
         except Exception as e:
             logger.error(f"Error processing Nearby Search response: {e}")
+            search_failed = True
 
     # 如果有 Text Search 任務，則處理其結果。
     if text_task:
@@ -131,36 +198,69 @@ async def find_and_sync_nearby_stores(
         # 如果結果是一個例外，表示請求失敗。
         if isinstance(text_result_or_exc, Exception):
             logger.error(f"Google Text Search API request failed: {text_result_or_exc}")
+            search_failed = True
         else:
             try:
                 # 檢查 HTTP 回應狀態碼。
                 text_result_or_exc.raise_for_status()
-                # 解析 JSON 回應，並取得第一個（也是唯一一個）店家結果。
-                text_result = await text_result_or_exc.json()
-                landmark_place = text_result.get("places", [None])[0]
+                # 解析 JSON 回應，並取得第一個（也是唯一一個）店家結果；沒有結果（或列表為空）時為 None。
+                text_result = orjson.loads(await text_result_or_exc.read())
+                landmark_place = next(iter(text_result.get("places") or ()), None)
             except Exception as e:
                 logger.error(f"Error processing Text Search response: {e}")
+                search_failed = True
 
-    # 如果所有搜尋都沒有找到店家，記錄警告並返回空列表。
+    # 如果所有搜尋都沒有找到店家，返回空列表。
     if not final_places:
-        logger.warning("No places found after API calls.")
-        return []
+        if not search_failed:
+            _places_search_cache[cache_key] = ([], None)
+        return [], None
 
     # 如果文字搜尋找到了店家，並且該店家類型是餐廳或食品店，則將其置於列表最前端。
     landmark_place_id = None
-    if landmark_place and (
-        "restaurant" in landmark_place.get("types", [])
-        or "food_store" in landmark_place.get("types", [])
+    if landmark_place and not _LANDMARK_FOOD_TYPES.isdisjoint(
+        landmark_place.get("types") or ()
     ):
         logger.info(f"Landmark '{title}' is a restaurant or food store. Prepending to the list.")
         landmark_place_id = landmark_place.get("id")
-        # 從 Nearby Search 的結果中移除與地標重複的店家，避免重複顯示。
-        final_places = [p for p in final_places if p.get("id") != landmark_place_id]
-        # 將地標店家插入到列表的最前面。
-        final_places.insert(0, landmark_place)
+        # 將地標店家放在列表最前面，並在同一次走訪中移除 Nearby Search 結果裡與地標重複的店家，避免重複顯示。
+        final_places = [
+            landmark_place,
+            *(p for p in final_places if p.get("id") != landmark_place_id),
+        ]
+
+    if not search_failed:
+        _places_search_cache[cache_key] = (final_places, landmark_place_id)
+    return final_places, landmark_place_id
+
+
+async def find_and_sync_nearby_stores(
+    db: AsyncSession,
+    aiohttp_session: aiohttp.ClientSession,
+    user_lat: float,
+    user_lng: float,
+    title: Optional[str] = None,
+    address: Optional[str] = None,
+    prefetched_places: Optional[Tuple[List[Dict[str, Any]], Optional[str]]] = None,
+) -> List[Store]:
+    """
+    根據使用者位置，呼叫 Google Places API 搜尋附近的店家，
+    並將新店家同步到資料庫，最後返回一個排序後的店家列表。
+    若呼叫端已事先以 `search_nearby_places` 取得搜尋結果，可透過 `prefetched_places` 傳入，省去重複的 API 呼叫。
+    """
+    if prefetched_places is None:
+        prefetched_places = await search_nearby_places(
+            aiohttp_session, user_lat, user_lng, title=title, address=address
+        )
+    final_places, landmark_place_id = prefetched_places
+
+    # 如果所有搜尋都沒有找到店家，記錄警告並返回空列表。
+    if not final_places:
+        logger.warning("No places found after API calls.")
+        return []
 
     # 取得所有 Google Place ID，用於後續批次查詢資料庫。
-    place_ids_from_api = [place.get("id") for place in final_places if place.get("id")]
+    place_ids_from_api = [place_id for place in final_places if (place_id := place.get("id"))]
     # 根據 Place ID 列表，從資料庫批次查詢已存在的店家。
     existing_stores_result = await crud.get_stores_by_place_ids(db, place_ids_from_api)
     # 將查詢結果轉換為一個字典，以 Place ID 為鍵，方便快速查找。
@@ -191,12 +291,14 @@ async def find_and_sync_nearby_stores(
                 # 組合一個指向我們代理 API 端點的 URL。
                 new_photo_url = f"/api/v1/places/photo/{photo_name}"
 
+            # 店家的座標，只取出一次供緯度與經度共用。
+            location = place.get("location") or {}
             # 創建一個新的 Store ORM 物件。
             store_in_db = Store(
                 store_name=new_store_name,
                 partner_level=0, # 預設合作等級為 0。
-                gps_lat=place.get("location", {}).get("latitude"),
-                gps_lng=place.get("location", {}).get("longitude"),
+                gps_lat=location.get("latitude"),
+                gps_lng=location.get("longitude"),
                 place_id=place_id,
                 main_photo_url=new_photo_url,
             )
@@ -210,7 +312,14 @@ async def find_and_sync_nearby_stores(
     if new_stores_to_add:
         logger.info(f"Committing {len(new_stores_to_add)} new stores to the database.")
         # 使用 `crud.add_stores` 函式將所有新店家一次性寫入資料庫，以減少 I/O 次數。
-        await crud.add_stores(db, new_stores_to_add)
+        # 以寫入後取回的店家物件（含 `store_id`）取代列表中尚未寫入的物件。
+        added_stores_map = {
+            store.place_id: store for store in await crud.add_stores(db, new_stores_to_add)
+        }
+        synced_stores = [
+            added_stores_map.get(store.place_id, store) if store.store_id is None else store
+            for store in synced_stores
+        ]
 
     # 根據是否找到地標店家，對列表進行排序。
     landmark_store = None
@@ -1,14 +1,15 @@
 # 導入 logging 模組，用於記錄日誌訊息。
 import logging
-# 導入 typing 模組中的 List 型別，用於型別提示。
-from typing import List
+# 導入 typing 模組中的型別，用於型別提示。
+from typing import List, NamedTuple, Optional
+
+# 具存活時間與容量上限的快取，用於使用者資料快取
+from cachetools import TTLCache
 
 # 從 linebot SDK 導入非同步相關的類別。
 from linebot.v3.messaging import (
-    AsyncApiClient,     # 非同步 API 客戶端
-    Configuration,      # LINE SDK 的設定類別
+    AsyncMessagingApi,  # 非同步訊息 API 客戶端
     Message,            # 所有訊息類別的基底類別
-    MessagingApi,       # 非同步訊息 API 客戶端
     PushMessageRequest, # 建立推播訊息請求的類別
 )
 # 從 sqlalchemy.ext.asyncio 導入 AsyncSession，用於型別提示資料庫會話物件。
@@ -16,62 +17,107 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 # 從上層目錄 (app/) 導入 crud 和 line_messages 模組。
 from .. import crud, line_messages
-# 導入設定檔 Config。
-from ..config import Config
 # 導入 User 模型，用於型別提示。
 from ..models import User
 
 # 取得一個 logger 實例，名稱與當前模組相同。
 logger = logging.getLogger(__name__)
 
-# 使用設定檔中的 Access Token 來初始化 LINE SDK 的設定。
-line_config = Configuration(access_token=Config.CHANNEL_ACCESS_TOKEN)
+# 使用者快取的容量上限與存活時間（秒）
+USER_CACHE_MAX_SIZE = 10_000
+# 快取只存在於單一行程，其他執行個體上的變更最多要等到項目過期才會生效，因此存活時間保持短暫。
+USER_CACHE_TTL_SECONDS = 10
+
+
+class CachedUser(NamedTuple):
+    """使用者快取中保存的不可變快照，只包含處理事件所需的欄位。"""
+
+    user_id: int
+    line_user_id: str
+    preferred_lang: str
+    state: Optional[str]
+
+
+# 使用者資料的行程內快取，Key 為 LINE User ID，Value 為 `CachedUser` 快照。
+# 同一位使用者常在短時間內連續點擊按鈕，快取可省去每個事件都查詢一次資料庫。
+# 快取的是不可變的快照而非 ORM 物件，並行處理的事件不會共用、修改同一個物件。
+# 使用者資料變更時（加入好友、設定語言），於提交到資料庫之後以最新內容覆寫對應的項目。
+_user_cache: TTLCache = TTLCache(
+    maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS
+)
+
+
+def _snapshot(user: User) -> CachedUser:
+    """建立使用者的不可變快照。"""
+    return CachedUser(
+        user_id=user.user_id,
+        line_user_id=user.line_user_id,
+        preferred_lang=user.preferred_lang,
+        state=user.state,
+    )
+
+
+async def get_user_cached(db: AsyncSession, line_user_id: str) -> Optional[User]:
+    """
+    取得使用者資料，優先從行程內快取讀取。
+    命中時以快照建立一個新的 User 物件，每個事件各自擁有自己的物件。
+    找不到的使用者不會被快取，讓使用者加入好友後能立即被查到。
+    """
+    snapshot = _user_cache.get(line_user_id)
+    if snapshot is not None:
+        return User(**snapshot._asdict())
+    user = await crud.get_user_by_line_id(db, line_user_id)
+    # 只在快取中沒有項目時寫入：若查詢期間已有其他事件提交變更並更新快取，不以可能較舊的查詢結果覆蓋。
+    if user is not None and line_user_id not in _user_cache:
+        _user_cache[line_user_id] = _snapshot(user)
+    return user
+
+
+def cache_user(user: User) -> None:
+    """使用者資料提交到資料庫之後呼叫，以最新內容覆寫快取。"""
+    _user_cache[user.line_user_id] = _snapshot(user)
 
 
 async def handle_new_user_follow(
-    db: AsyncSession, line_user_id: str, translate_client, lang_code_map: dict
+    db: AsyncSession,
+    line_user_id: str,
+    translate_client,
+    lang_code_map: dict,
+    messaging_api: AsyncMessagingApi,
 ):
     """
     處理使用者加入好友或解除封鎖的事件。
     這個函式會建立或更新使用者資料，並發送一個歡迎訊息及主選單。
+    `messaging_api` 為應用程式共用的 LINE API 客戶端，重用其連線池，不需每次建立新的連線。
     """
     # 預設使用者的語言為英文。
     user_language = "en"
     try:
-        # 使用非同步 API 客戶端來執行非同步請求。
-        async with AsyncApiClient(line_config) as api_client:
-            # 呼叫 LINE Messaging API 的 get_profile 方法，取得使用者的個人資料。
-            profile = await MessagingApi(api_client).get_profile(line_user_id)
-            # 如果使用者資料中包含語言資訊，則更新 user_language 變數。
-            if profile.language:
-                user_language = profile.language
+        # 呼叫 LINE Messaging API 的 get_profile 方法，取得使用者的個人資料。
+        profile = await messaging_api.get_profile(line_user_id)
+        # 如果使用者資料中包含語言資訊，則更新 user_language 變數。
+        if profile.language:
+            user_language = profile.language
     except Exception as e:
         # 如果取得個人資料失敗，記錄錯誤日誌。
         logger.error(f"Failed to get user profile for {line_user_id}: {e}")
 
-    # 使用 crud 函式查詢資料庫，檢查使用者是否已存在。
-    user = await crud.get_user_by_line_id(db, line_user_id)
-
-    # 如果使用者不存在...
-    if not user:
-        # 呼叫 crud 函式建立一個新的使用者。
-        user = await crud.create_user(db, line_user_id, user_language)
-    else:
-        # 如果使用者已存在，則更新其偏好語言和狀態。
-        user = await crud.update_user(db, user, preferred_lang=user_language, state="normal")
+    # 以單一 upsert 語句建立使用者，若已存在則更新其偏好語言並將狀態重設為 "normal"。
+    # 不需要先查詢使用者是否存在，也避免同時抵達的重複事件造成唯一鍵衝突。
+    user = await crud.upsert_user(db, line_user_id, user_language)
+    # 寫入已提交，以最新的使用者資料更新快取。
+    cache_user(user)
 
     # 使用 line_messages 模組中的函式，建立一則包含歡迎文字和主選單的訊息列表。
     welcome_messages = await line_messages.create_main_menu_messages(
         user, translate_client, lang_code_map
     )
 
-    # 再次使用非同步 API 客戶端。
-    async with AsyncApiClient(line_config) as api_client:
-        # 呼叫 LINE Messaging API 的 push_message 方法，主動將歡迎訊息推播給使用者。
-        # PushMessageRequest 用於指定訊息的接收者 (to) 和內容 (messages)。
-        await MessagingApi(api_client).push_message(
-            PushMessageRequest(to=line_user_id, messages=welcome_messages)
-        )
+    # 呼叫 LINE Messaging API 的 push_message 方法，主動將歡迎訊息推播給使用者。
+    # PushMessageRequest 用於指定訊息的接收者 (to) 和內容 (messages)。
+    await messaging_api.push_message(
+        PushMessageRequest(to=line_user_id, messages=welcome_messages)
+    )
 
 
 async def handle_unknown_command(
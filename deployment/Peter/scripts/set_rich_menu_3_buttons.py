@@ -1,5 +1,4 @@
 import os
-import json
 import requests
 from dotenv import load_dotenv
 
@@ -16,10 +15,9 @@ def main():
         print("錯誤：請在 .env 檔案中設定 CHANNEL_ACCESS_TOKEN")
         return
 
-    headers = {
-        'Authorization': f'Bearer {channel_access_token}',
-        'Content-Type': 'application/json'
-    }
+    # 所有 LINE API 呼叫共用同一個 Session，對同一主機的請求會重用既有的 TLS 連線，授權標頭也只需設定一次。
+    session = requests.Session()
+    session.headers['Authorization'] = f'Bearer {channel_access_token}'
 
     # --- 步驟一：【已修改】準備三格按鈕的 JSON 設計圖 ---
     rich_menu_object = {
@@ -54,10 +52,9 @@ def main():
     # 步驟二：註冊設計圖
     print("步驟 2/4: 正在建立圖文選單物件...")
     try:
-        req = requests.post(
+        req = session.post(
             'https://api.line.me/v2/bot/richmenu',
-            headers=headers,
-            data=json.dumps(rich_menu_object)
+            json=rich_menu_object
         )
         req.raise_for_status()
         rich_menu_id = req.json()['richMenuId']
@@ -77,10 +74,9 @@ def main():
 
     try:
         with open(image_path, 'rb') as f:
-            upload_headers = {'Authorization': f'Bearer {channel_access_token}', 'Content-Type': 'image/jpeg'}
-            req = requests.post(
+            req = session.post(
                 f'https://api-data.line.me/v2/bot/richmenu/{rich_menu_id}/content',
-                headers=upload_headers,
+                headers={'Content-Type': 'image/jpeg'},
                 data=f
             )
             req.raise_for_status()
@@ -92,9 +88,8 @@ def main():
     # 步驟四：設定為預設
     print("\n步驟 4/4: 正在將此選單設定為預設...")
     try:
-        req = requests.post(
-            f'https://api.line.me/v2/bot/user/all/richmenu/{rich_menu_id}',
-            headers={'Authorization': f'Bearer {channel_access_token}'}
+        req = session.post(
+            f'https://api.line.me/v2/bot/user/all/richmenu/{rich_menu_id}'
         )
         req.raise_for_status()
         print("成功將圖文選單設定為預設！")